@@ -1,14 +1,59 @@
+from django.conf import settings
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.contrib.auth.forms import UserChangeForm
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from .images import externalize_picture
 from .models import UserModel  # Ensure this matches your actual import path
+from .pagination import EstimatedCountPaginator
+
+
+class CachedAllValuesFieldListFilter(admin.AllValuesFieldListFilter):
+    """Sidebar filter for free-text columns whose distinct values are cached.
+
+    The stock filter runs ``SELECT DISTINCT`` over the whole table on every
+    changelist render; here the values are computed once per
+    ADMIN_FACET_CACHE_TIMEOUT seconds and shared between requests.
+    """
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        key = f"admin-facets:{model._meta.label_lower}:{field_path}"
+        choices = cache.get(key)
+        if choices is None:
+            # lookup_choices is still a lazy queryset at this point
+            choices = list(self.lookup_choices)
+            cache.set(key, choices, settings.ADMIN_FACET_CACHE_TIMEOUT)
+        self.lookup_choices = choices
+
+
+class ProfileUserChangeForm(UserChangeForm):
+    """Move pictures pasted as data URLs into the image store on save"""
+    def clean_profile_picture(self):
+        try:
+            return externalize_picture(self.cleaned_data.get("profile_picture"))
+        except ValueError as exc:
+            raise ValidationError(str(exc))
+
 
 # Extend the default UserAdmin to include custom fields
 class CustomUserAdmin(UserAdmin):
     model = UserModel
+    form = ProfileUserChangeForm
 
     # Display these fields in the admin panel list view
     list_display = ("id", "username", "email", "phone_number", "role", "is_active", "is_staff")
-    list_filter = ("is_active", "is_staff", "role", "country", "city")
+    list_filter = (
+        "is_active",
+        "is_staff",
+        ("role", CachedAllValuesFieldListFilter),
+        ("country", CachedAllValuesFieldListFilter),
+        ("city", CachedAllValuesFieldListFilter),
+    )
+
+    # Avoid COUNT(*) over millions of rows on every page load
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     # Define fieldsets for adding/editing users in the admin panel
     fieldsets = (
@@ -26,6 +71,7 @@ class CustomUserAdmin(UserAdmin):
         }),
     )
 
+    # icontains on these columns is served by the trigram indexes from migration 0004 on PostgreSQL
     search_fields = ("username", "email", "phone_number")
     ordering = ("id",)
 
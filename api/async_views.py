@@ -0,0 +1,243 @@
+"""Native async versions of the auth and profile endpoints.
+
+DRF function views are sync-only, so under ASGI every call to ``api.views``
+is pushed onto a thread. These views use Django's async ORM instead and
+return the same payloads and status codes. They are routed in place of the
+sync views when ``ASYNC_API_VIEWS`` is enabled.
+"""
+import json
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST, require_GET
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .hashing import HashingOverloaded, aauthenticate_user, ahash_password
+from .images import decode_picture, image_url, store_image
+from .models import BlacklistedToken
+from .profile_cache import add_validators, aget_profile_entry, not_modified
+from .routers import ause_replica
+from .serializers import parse_fields, pick_fields
+from .throttling import LoginIPRateThrottle, LoginUsernameRateThrottle
+from .token_writer import token_writer
+from .tokens import BufferedRefreshToken
+from .views import BODY_NOT_AN_OBJECT, REGISTER_REQUIRED_FIELDS, get_tokens_for_user, missing_fields, missing_fields_message
+
+# Get the User model
+User = get_user_model()
+
+jwt_authentication = JWTAuthentication()
+
+
+def request_data(request):
+    """Parse the body like DRF: ``(data, None)`` for a JSON or form object, else ``(None, 400 response)``"""
+    if request.content_type != "application/json":
+        return request.POST, None
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError as exc:
+        return None, JsonResponse({"detail": f"JSON parse error - {exc}"}, status=400)
+    if not isinstance(data, dict):
+        return None, JsonResponse({"error": BODY_NOT_AN_OBJECT}, status=400)
+    return data, None
+
+
+def hashing_overloaded_response():
+    response = JsonResponse({"error": "Too many authentication requests, please retry shortly."}, status=503)
+    response["Retry-After"] = "1"
+    return response
+
+
+def blacklist_refresh_token(refresh_token):
+    BufferedRefreshToken(refresh_token).blacklist()
+
+
+def jwt_required(view):
+    """Async counterpart of ``@permission_classes([IsAuthenticated])`` with JWT auth"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        # BlacklistAccessTokenMiddleware has usually parsed the header already
+        raw_token = getattr(request, "jwt_raw_token", None)
+        if raw_token is None:
+            header = jwt_authentication.get_header(request)
+            raw_token = jwt_authentication.get_raw_token(header) if header else None
+        if raw_token is None:
+            return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+        try:
+            validated_token = getattr(request, "jwt_validated_token", None) or jwt_authentication.get_validated_token(raw_token)
+            user_id = validated_token[jwt_settings.USER_ID_CLAIM]
+            user = await User.objects.aget(**{jwt_settings.USER_ID_FIELD: user_id})
+        except (InvalidToken, KeyError, User.DoesNotExist):
+            return JsonResponse({"detail": "Given token not valid for any token type"}, status=401)
+
+        if not user.is_active:
+            return JsonResponse({"detail": "User is inactive"}, status=401)
+
+        request.user = user
+        request.auth = validated_token
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+@csrf_exempt
+@require_POST
+async def register(request):
+    """User Registration"""
+    data, error_response = request_data(request)
+    if error_response:
+        return error_response
+
+    missing = missing_fields(data, REGISTER_REQUIRED_FIELDS)
+    if missing:
+        return JsonResponse({"error": missing_fields_message(missing)}, status=400)
+
+    username = data.get("username")
+    email = data.get("email")
+    password = data.get("password")
+
+    if await User.objects.filter(username=username).aexists():
+        return JsonResponse({"error": "Username is already taken."}, status=400)
+
+    if await User.objects.filter(email=email).aexists():
+        return JsonResponse({"error": "A user with this email already exists."}, status=400)
+
+    profile_picture = data.get("profile_picture", "")
+    try:
+        # Decoding the image is blocking work
+        picture_data = await sync_to_async(decode_picture, thread_sensitive=False)(profile_picture)
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    try:
+        hashed_password = await ahash_password(password)
+    except HashingOverloaded:
+        return hashing_overloaded_response()
+
+    if picture_data is not None:
+        # Stored only once the hash is done, so a shed request leaves no file behind
+        try:
+            profile_picture = image_url(await sync_to_async(store_image, thread_sensitive=False)(picture_data))
+        except ValueError as exc:
+            return JsonResponse({"error": str(exc)}, status=400)
+
+    user = await User.objects.acreate(
+        username=username,
+        email=email,
+        phone_number=data.get("phone_number", ""),
+        address=data.get("address", ""),
+        profile_picture=profile_picture,
+        country=data.get("country", ""),
+        city=data.get("city", ""),
+        role=data.get("role", ""),
+        password=hashed_password,
+    )
+
+    tokens = await sync_to_async(get_tokens_for_user)(user)
+    return JsonResponse({"user_id": user.id, "tokens": tokens}, status=201)
+
+
+@csrf_exempt
+@require_POST
+async def login(request):
+    """User Login"""
+    data, error_response = request_data(request)
+    if error_response:
+        return error_response
+
+    # Throttle before hashing so rejected attempts cost no CPU
+    username = data.get("username")
+    ip_throttle = LoginIPRateThrottle()
+    username_throttle = LoginUsernameRateThrottle()
+    checks = [(ip_throttle, ip_throttle.get_ident(request))]
+    if isinstance(username, str) and username:
+        checks.append((username_throttle, username.lower()))
+    for throttle, ident in checks:
+        if not await throttle.aallow(ident):
+            wait = throttle.wait()
+            response = JsonResponse({"detail": f"Request was throttled. Expected available in {int(wait)} seconds."}, status=429)
+            response["Retry-After"] = str(int(wait))
+            return response
+
+    try:
+        user = await aauthenticate_user(data.get("username"), data.get("password"))
+    except HashingOverloaded:
+        return hashing_overloaded_response()
+
+    if user is None:
+        return JsonResponse({"error": "Invalid username or password."}, status=400)
+
+    if not user.is_active:
+        return JsonResponse({"error": "This account is inactive. Contact support."}, status=400)
+
+    tokens = await sync_to_async(get_tokens_for_user)(user)
+    return JsonResponse({"user_id": user.id, "tokens": tokens}, status=200)
+
+
+@csrf_exempt
+@require_POST
+@jwt_required
+async def logout(request):
+    """User Logout"""
+    data, error_response = request_data(request)
+    if error_response:
+        return error_response
+
+    refresh_token = data.get("refresh_token")
+    access_token = request.headers.get("Authorization", "").split(" ")[1]  # Extract access token
+
+    if not refresh_token:
+        return JsonResponse({"error": "Refresh token is required"}, status=400)
+
+    try:
+        # Blacklist the refresh token (verifying it queries the blacklist, so it runs in a thread)
+        await sync_to_async(blacklist_refresh_token)(refresh_token)
+
+        # Blacklist the access token
+        await token_writer.arevoke_access(BlacklistedToken.digest(access_token), datetime_from_epoch(request.auth["exp"]))
+
+        return JsonResponse({"message": "Logged out successfully"}, status=200)
+    except Exception:
+        return JsonResponse({"error": "Invalid or expired refresh token"}, status=400)
+
+
+@require_GET
+@jwt_required
+async def get_current_user_profile(request):
+    """Get the authenticated user's profile"""
+    try:
+        fields = parse_fields(request.GET.get("fields"))
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    user = request.user
+    entry = await aget_profile_entry(user.id, user)
+    return not_modified(request, entry) or add_validators(JsonResponse(pick_fields(entry["data"], fields), status=200), entry)
+
+
+@require_GET
+@jwt_required
+async def get_single_user_profile(request, user_id=None):
+    """Retrieve a single user profile"""
+    try:
+        fields = parse_fields(request.GET.get("fields"))
+    except ValueError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+
+    if user_id:
+        async with ause_replica(user_id, request.user.id):
+            entry = await aget_profile_entry(user_id, fields=fields)
+    else:
+        entry = await aget_profile_entry(request.user.id, request.user)
+
+    if entry is None:
+        return JsonResponse({"error": "User not found"}, status=404)
+
+    return not_modified(request, entry) or add_validators(JsonResponse(pick_fields(entry["data"], fields), status=200), entry)
@@ -0,0 +1,53 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+
+# Claims copied from the user into every token at login and again on every refresh
+IDENTITY_CLAIMS = ("username", "role", "is_staff", "is_superuser")
+
+
+def set_identity_claims(token, user):
+    """Copy the user's current identity claims onto ``token``"""
+    for claim in IDENTITY_CLAIMS:
+        token[claim] = getattr(user, claim)
+
+
+class SharedJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that decodes the bearer token at most once per request.
+
+    BlacklistAccessTokenMiddleware already splits the Authorization header
+    and leaves the raw token on the request; the validated token is cached
+    on the Django request so every authenticator consulted afterwards
+    reuses it instead of decoding the JWT again.
+    """
+    def authenticate(self, request):
+        http_request = getattr(request, "_request", request)
+
+        validated_token = getattr(http_request, "jwt_validated_token", None)
+        if validated_token is None:
+            raw_token = getattr(http_request, "jwt_raw_token", None)
+            if raw_token is None:
+                header = self.get_header(request)
+                if header is None:
+                    return None
+                raw_token = self.get_raw_token(header)
+                if raw_token is None:
+                    return None
+            validated_token = self.get_validated_token(raw_token)
+            http_request.jwt_validated_token = validated_token
+
+        return self.get_user(validated_token), validated_token
+
+
+class StatelessJWTAuthentication(SharedJWTAuthentication):
+    """Opt-in authentication that trusts the signed identity claims.
+
+    ``request.user`` is a ``TokenUser`` built from the token (``id``,
+    ``username``, ``role``, ``is_staff``) so no ``UserModel`` row is loaded.
+    Only use it on endpoints that need nothing beyond identity and role.
+    Changes to the user are not seen by an access token that was already
+    issued. The claims are re-read from the user row on every refresh, so
+    a role change or deactivation takes effect once the current access
+    token expires (ACCESS_TOKEN_LIFETIME), or at once after ``logout_all``.
+    """
+    def get_user(self, validated_token):
+        return TokenUser(validated_token)
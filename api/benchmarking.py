@@ -0,0 +1,221 @@
+import http.client
+import itertools
+import json
+import secrets
+import statistics
+import threading
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import CommandError
+from django.db import connections
+
+SEED_PREFIX = "seed_"
+LOCAL_HOSTS = ("", "localhost", "127.0.0.1", "::1")
+SEED_ROLES = ("customer", "vendor", "driver", "admin")
+SEED_COUNTRIES = ("Egypt", "Morocco", "Kenya", "Nigeria", "Ghana", "Tunisia", "Jordan", "Saudi Arabia")
+SEED_CITIES = ("Cairo", "Alexandria", "Giza", "Luxor", "Aswan", "Casablanca", "Rabat", "Nairobi",
+               "Mombasa", "Lagos", "Abuja", "Accra", "Tunis", "Amman", "Riyadh", "Jeddah")
+
+
+def check_local_database(allow_remote=False, alias="default"):
+    """Refuse to write benchmark data to anything but SQLite or a database on this host"""
+    database = connections[alias].settings_dict
+    if allow_remote or connections[alias].vendor == "sqlite" or database.get("HOST") in LOCAL_HOSTS:
+        return
+    raise CommandError(
+        f"Refusing to write benchmark users to the database on {database['HOST']}. Point DATABASE_URL "
+        f"at SQLite or a local server, or pass --allow-remote."
+    )
+
+
+def bench_password():
+    """A fresh password for the accounts of one benchmark run"""
+    return secrets.token_urlsafe(16)
+
+
+def seed_users(count, batch_size=5000):
+    """Make sure at least ``count`` synthetic users exist and return how many were added.
+
+    Seeded users cannot log in (they get an unusable password), which also
+    keeps seeding millions of rows free of PBKDF2 runs.
+    """
+    User = get_user_model()
+    existing = User.objects.filter(username__startswith=SEED_PREFIX).count()
+    if existing >= count:
+        return 0
+
+    password = make_password(None)
+    numbers = iter(range(existing, count))
+    while batch := list(itertools.islice(numbers, batch_size)):
+        User.objects.bulk_create([
+            User(
+                username=f"{SEED_PREFIX}{n}",
+                email=f"{SEED_PREFIX}{n}@example.com",
+                password=password,
+                phone_number=f"+20{n:010d}",
+                address=f"{n} Example Street",
+                country=SEED_COUNTRIES[n % len(SEED_COUNTRIES)],
+                city=SEED_CITIES[n % len(SEED_CITIES)],
+                role=SEED_ROLES[n % len(SEED_ROLES)],
+                is_active=n % 50 != 0,
+            )
+            for n in batch
+        ])
+    return count - existing
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not samples:
+        return 0.0
+    rank = max(0, min(len(samples) - 1, round(pct / 100 * len(samples)) - 1))
+    return samples[rank]
+
+
+class LoadResult:
+    def __init__(self, latencies, statuses, elapsed, queries=None):
+        self.latencies = sorted(latencies)
+        self.statuses = statuses
+        self.elapsed = elapsed
+        self.queries = queries or []
+
+    def summary(self):
+        ms = [latency * 1000 for latency in self.latencies]
+        summary = {
+            "requests": len(ms),
+            "errors": sum(count for status, count in self.statuses.items() if status >= 400),
+            "statuses": {str(status): count for status, count in sorted(self.statuses.items())},
+            "seconds": round(self.elapsed, 3),
+            "rps": round(len(ms) / self.elapsed, 1) if self.elapsed else 0.0,
+            "mean_ms": round(statistics.fmean(ms), 2) if ms else 0.0,
+            "p50_ms": round(percentile(ms, 50), 2),
+            "p95_ms": round(percentile(ms, 95), 2),
+            "p99_ms": round(percentile(ms, 99), 2),
+        }
+        if self.queries:
+            summary["queries_per_request"] = round(statistics.fmean(self.queries), 2)
+            summary["max_queries"] = max(self.queries)
+        return summary
+
+
+class HTTPLoadClient:
+    """Keep-alive HTTP client for a running server; cannot see DB queries"""
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.conn = http.client.HTTPConnection(host, port, timeout=30)
+
+    def send(self, method, path, body, headers):
+        try:
+            self.conn.request(method, path, body=body, headers=headers)
+            response = self.conn.getresponse()
+            response.read()
+            return response.status, None
+        except (OSError, http.client.HTTPException):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            return 599, None
+
+    def close(self):
+        self.conn.close()
+
+
+class InProcessLoadClient:
+    """Calls the Django handler directly and counts the DB queries of every request"""
+    def __init__(self, count_queries=True):
+        from django.test import Client
+
+        self.client = Client(HTTP_HOST="127.0.0.1")
+        self.count_queries = count_queries
+
+    def send(self, method, path, body, headers):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        extra = {"headers": headers}
+        if body is not None:
+            extra["data"] = body
+            extra["content_type"] = headers.get("Content-Type", "application/octet-stream")
+        if not self.count_queries:
+            return self.client.generic(method, path, **extra).status_code, None
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.generic(method, path, **extra)
+            # Streaming responses run their queries while being consumed
+            if response.streaming:
+                b"".join(response.streaming_content)
+        return response.status_code, len(queries)
+
+    def close(self):
+        from django.db import connections
+
+        connections.close_all()
+
+
+def run_load(make_client, build_request, concurrency, total):
+    """Drive ``total`` requests from ``concurrency`` concurrent clients.
+
+    ``make_client()`` returns an ``HTTPLoadClient``/``InProcessLoadClient``
+    for each worker thread. ``build_request(i)`` returns ``(method, path,
+    body, headers)`` for the i-th request; ``body`` may be a dict, which is
+    sent as JSON.
+    """
+    latencies = []
+    statuses = {}
+    query_counts = []
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker():
+        client = make_client()
+        local_latencies = []
+        local_statuses = {}
+        local_queries = []
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            method, path, body, headers = build_request(i)
+            headers = dict(headers or {})
+            if isinstance(body, dict):
+                body = json.dumps(body)
+                headers.setdefault("Content-Type", "application/json")
+
+            started = time.perf_counter()
+            status, queries = client.send(method, path, body, headers)
+            local_latencies.append(time.perf_counter() - started)
+            local_statuses[status] = local_statuses.get(status, 0) + 1
+            if queries is not None:
+                local_queries.append(queries)
+        client.close()
+
+        with lock:
+            latencies.extend(local_latencies)
+            query_counts.extend(local_queries)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return LoadResult(latencies, statuses, time.perf_counter() - started, query_counts)
+
+
+def wait_for_port(host, port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=1)
+            conn.request("GET", "/swagger.json/")
+            conn.getresponse().read()
+            conn.close()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
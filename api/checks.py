@@ -0,0 +1,58 @@
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS
+from django.core.checks import Tags, Warning, register
+
+# Cache backends whose contents are private to one process
+PROCESS_LOCAL_CACHES = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+def cache_is_shared(alias=DEFAULT_CACHE_ALIAS):
+    """Whether every server process sees the same ``alias`` cache"""
+    return settings.CACHES[alias]["BACKEND"] not in PROCESS_LOCAL_CACHES
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    # One process sees every write, so a private cache cannot go stale
+    if settings.SERVER_WORKERS <= 1 or cache_is_shared():
+        return []
+    return [Warning(
+        f"The default cache is private to each of the {settings.SERVER_WORKERS} worker processes.",
+        hint=(
+            "Set REDIS_URL. Otherwise a profile saved in one worker stays cached in the others "
+            "for up to PROFILE_CACHE_TIMEOUT seconds."
+        ),
+        id="api.W001",
+    )]
+
+
+@register(Tags.caches)
+def check_token_write_behind_cache(app_configs, **kwargs):
+    if not settings.TOKEN_WRITE_BEHIND or cache_is_shared():
+        return []
+    return [Warning(
+        "TOKEN_WRITE_BEHIND is on with a per-process cache.",
+        hint=(
+            "A refresh token blacklisted in one worker is accepted by the others until its row is "
+            "flushed (up to TOKEN_WRITE_BEHIND_INTERVAL seconds). Set REDIS_URL."
+        ),
+        id="api.W002",
+    )]
+
+
+@register()
+def check_hashing_isolation(app_configs, **kwargs):
+    if settings.ASYNC_API_VIEWS or settings.SERVER_THREADS > 1:
+        return []
+    return [Warning(
+        "Each gunicorn worker runs a single thread (GUNICORN_THREADS=1).",
+        hint=(
+            "Password hashing then runs on the only request thread: logins are never shed with "
+            "503 and block every other request of the worker while they hash. Set GUNICORN_THREADS "
+            "above 1 or serve the async views (ASYNC_API_VIEWS=1)."
+        ),
+        id="api.W003",
+    )]
@@ -0,0 +1,59 @@
+import gzip
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional, gzip is always available
+    brotli = None
+
+# Content codings this server can produce, preferred first
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def parse_accept_encoding(header):
+    """``{coding: q}`` for an Accept-Encoding header value"""
+    qualities = {}
+    for item in header.split(","):
+        coding, _, params = item.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+def negotiate(header):
+    """Best coding both sides support for an Accept-Encoding header, or ``None`` to send the body as is.
+
+    The client's q-values decide; ties go to the server's preference
+    (brotli over gzip). ``q=0`` and unlisted codings are never chosen,
+    except through ``*``.
+    """
+    qualities = parse_accept_encoding(header or "")
+    best, best_quality = None, 0.0
+    for coding in ENCODINGS:
+        quality = qualities.get(coding, qualities.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+def compress(data, coding, level):
+    """``data`` compressed with ``coding`` at ``level`` (gzip 1-9, brotli quality 0-11)"""
+    if coding == "br":
+        return brotli.compress(data, quality=level)
+    # A fixed mtime keeps the output identical for identical bodies
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def decompress(data, coding):
+    if coding == "br":
+        return brotli.decompress(data)
+    return gzip.decompress(data)
@@ -0,0 +1,86 @@
+import csv
+import logging
+import resource
+import sys
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+
+from .renderers import dumps
+from .serializers import USER_FIELDS, user_values
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+EXPORT_FORMATS = ("ndjson", "csv")
+EXPORT_FIELDS = USER_FIELDS
+
+
+class _Echo:
+    """File-like object whose ``write`` hands the line back to the caller"""
+    def write(self, value):
+        return value
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in megabytes"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class ExportStats:
+    """Row counter that reports throughput and peak memory of an export"""
+    def __init__(self):
+        self.rows = 0
+        self.started = time.monotonic()
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        return {
+            "rows": self.rows,
+            "seconds": round(self.elapsed, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }
+
+
+def iter_user_rows(chunk_size=None):
+    """Yield every user as a dict without buffering the table in memory.
+
+    On PostgreSQL ``.iterator()`` runs on a server-side cursor, so only
+    ``chunk_size`` rows are held by the worker at any time.
+    """
+    chunk_size = chunk_size or settings.USER_EXPORT_CHUNK_SIZE
+    return user_values(User.objects.order_by("id")).iterator(chunk_size=chunk_size)
+
+
+def iter_export_lines(fmt, chunk_size=None, stats=None):
+    """Encode the user table as NDJSON or CSV, one line at a time"""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    stats = stats or ExportStats()
+    rows = iter_user_rows(chunk_size)
+
+    if fmt == "csv":
+        writer = csv.DictWriter(_Echo(), fieldnames=EXPORT_FIELDS)
+        yield writer.writeheader()
+        for row in rows:
+            stats.rows += 1
+            yield writer.writerow(row)
+    else:
+        for row in rows:
+            stats.rows += 1
+            yield dumps(row).decode() + "\n"
+
+    logger.info("User export finished (%s): %s", fmt, stats.summary())
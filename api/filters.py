@@ -0,0 +1,42 @@
+from django.db.models import Q
+
+SEARCH_FIELDS = ("username", "email", "phone_number")
+SEARCH_MODES = ("contains", "prefix")
+EXACT_FILTERS = ("role", "country", "city")
+BOOLEAN_FILTERS = ("is_active", "is_staff")
+BOOLEAN_VALUES = {"true": True, "1": True, "false": False, "0": False}
+
+
+def filter_users(queryset, params):
+    """Apply the user listing's query-parameter filters and search.
+
+    ``role``, ``country`` and ``city`` are exact matches backed by
+    ``(column, id)`` b-tree indexes so a filtered keyset page stays a single
+    index range scan. ``search`` matches ``username``, ``email`` and
+    ``phone_number`` case-insensitively, as a substring by default or as a
+    prefix with ``search_mode=prefix``; on PostgreSQL both are served by
+    trigram indexes. Raises ``ValueError`` on invalid parameters.
+    """
+    for field in EXACT_FILTERS:
+        if field in params:
+            queryset = queryset.filter(**{field: params[field]})
+
+    for field in BOOLEAN_FILTERS:
+        if field in params:
+            value = BOOLEAN_VALUES.get(params[field].lower())
+            if value is None:
+                raise ValueError(f"{field} must be true or false")
+            queryset = queryset.filter(**{field: value})
+
+    search = params.get("search", "").strip()
+    if search:
+        mode = params.get("search_mode", "contains")
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"search_mode must be one of: {', '.join(SEARCH_MODES)}")
+        lookup = "icontains" if mode == "contains" else "istartswith"
+        condition = Q()
+        for field in SEARCH_FIELDS:
+            condition |= Q(**{f"{field}__{lookup}": search})
+        queryset = queryset.filter(condition)
+
+    return queryset
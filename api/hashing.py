@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import check_password, identify_hasher, make_password
+
+from .metrics import record_timing
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+class HashingOverloaded(Exception):
+    """Raised when the hashing queue is full and the request should be shed"""
+
+
+class PasswordHashingExecutor:
+    """Bounded pool that runs password hashing off the request path.
+
+    At most ``workers`` hashes run at once and at most ``max_pending`` more
+    may wait; anything beyond that is rejected immediately with
+    ``HashingOverloaded`` instead of queueing behind a login burst. Django's
+    PBKDF2 hasher releases the GIL, so a thread pool uses every core it is
+    given while keeping the rest of the API responsive.
+
+    Both limits apply to one process; every server worker has its own pool
+    (see PASSWORD_HASHING_WORKERS for how the defaults split the host).
+    Under WSGI the request thread still blocks until its hash is done, so
+    admission can only shed load when a worker has more threads than
+    ``workers + max_pending``.
+    """
+    def __init__(self, workers, max_pending):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._slots = threading.BoundedSemaphore(workers + max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._depth = 0
+        self._hashes = 0
+        self._hash_seconds = 0.0
+        self._rejected = 0
+
+    def run(self, fn, *args):
+        self._admit()
+        started = time.perf_counter()
+        try:
+            return self._get_executor().submit(self._timed, fn, *args).result()
+        finally:
+            record_timing("hash", time.perf_counter() - started)
+            self._release()
+
+    async def arun(self, fn, *args):
+        """Like ``run`` but awaits the hash without blocking the event loop"""
+        self._admit()
+        started = time.perf_counter()
+        try:
+            return await asyncio.wrap_future(self._get_executor().submit(self._timed, fn, *args))
+        finally:
+            record_timing("hash", time.perf_counter() - started)
+            self._release()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "queue_depth": self._depth,
+                "hashes": self._hashes,
+                "hash_seconds_total": self._hash_seconds,
+                "rejected": self._rejected,
+            }
+
+    def _admit(self, blocking=False):
+        if not self._slots.acquire(blocking=blocking):
+            with self._lock:
+                self._rejected += 1
+            logger.warning("Password hashing queue full (%s in flight), rejecting request", self._depth)
+            raise HashingOverloaded()
+
+        with self._lock:
+            self._depth += 1
+
+    def _release(self):
+        with self._lock:
+            self._depth -= 1
+        self._slots.release()
+
+    def _get_executor(self):
+        # Created lazily so every gunicorn worker gets its own pool after fork
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    def _timed(self, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._hashes += 1
+                self._hash_seconds += elapsed
+
+
+hashing_executor = PasswordHashingExecutor(
+    workers=settings.PASSWORD_HASHING_WORKERS,
+    max_pending=settings.PASSWORD_HASHING_MAX_PENDING,
+)
+
+
+def hash_password(password):
+    """``make_password`` run on the hashing pool"""
+    return hashing_executor.run(make_password, password)
+
+
+async def ahash_password(password):
+    return await hashing_executor.arun(make_password, password)
+
+
+def authenticate_user(username, password):
+    """Credential check equivalent to ``ModelBackend.authenticate``, hashed on the pool"""
+    try:
+        user = User._default_manager.get_by_natural_key(username)
+    except User.DoesNotExist:
+        # Hash anyway so unknown usernames take as long as wrong passwords
+        hash_password(password)
+        return None
+
+    if not hashing_executor.run(check_password, password, user.password):
+        return None
+
+    if identify_hasher(user.password).must_update(user.password):
+        user.password = hash_password(password)
+        user.save(update_fields=["password"])
+
+    return user if user.is_active else None
+
+
+async def aauthenticate_user(username, password):
+    """Async variant of ``authenticate_user``"""
+    try:
+        user = await User._default_manager.aget(**{User.USERNAME_FIELD: username})
+    except User.DoesNotExist:
+        await ahash_password(password)
+        return None
+
+    if not await hashing_executor.arun(check_password, password, user.password):
+        return None
+
+    if identify_hasher(user.password).must_update(user.password):
+        user.password = await ahash_password(password)
+        await user.asave(update_fields=["password"])
+
+    return user if user.is_active else None
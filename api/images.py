@@ -0,0 +1,175 @@
+import base64
+import binascii
+import hashlib
+import io
+import os
+import re
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+
+try:
+    from PIL import Image
+except ImportError:  # pragma: no cover - Pillow is optional, thumbnails are skipped without it
+    Image = None
+
+# Leading bytes of each accepted format and the extension it is stored under
+SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"\xff\xd8\xff", "jpg"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+)
+CONTENT_TYPES = {"png": "image/png", "jpg": "image/jpeg", "gif": "image/gif", "webp": "image/webp"}
+
+# Stored image names: "<2 hex>/<2 hex>/<sha256>.<ext>" (thumbnails add "_<size>" to the stem)
+IMAGE_NAME = re.compile(r"^([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}\.(png|jpg|gif|webp)$")
+
+validate_http_url = URLValidator(schemes=["http", "https"])
+
+
+def image_format(data):
+    """Extension for the image type of ``data``, or ``None`` if it is not a supported image"""
+    for signature, extension in SIGNATURES:
+        if data.startswith(signature):
+            return extension
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def image_path(name):
+    return Path(settings.PROFILE_IMAGE_ROOT) / name
+
+
+def image_url(name):
+    return f"{settings.PROFILE_IMAGE_URL}{name}"
+
+
+def thumbnail_name(name, size):
+    stem, extension = name.rsplit(".", 1)
+    return f"{stem}_{size}.{extension}"
+
+
+def _write_atomic(path, data):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+    with os.fdopen(fd, "wb") as out:
+        out.write(data)
+    # Concurrent writers of the same content both end up with the same file
+    os.replace(tmp, path)
+
+
+def _thumbnail(data, size):
+    with Image.open(io.BytesIO(data)) as image:
+        image_format_name = image.format
+        image.thumbnail((size, size))
+        out = io.BytesIO()
+        image.save(out, format=image_format_name)
+    return out.getvalue()
+
+
+def store_image(data):
+    """Store ``data`` under its SHA-256 digest, with its thumbnails; returns the image name.
+
+    Storing the same bytes again is a no-op, so every user with the same
+    picture shares one file. Raises ValueError for anything that is not a
+    PNG, JPEG, GIF or WebP image within PROFILE_IMAGE_MAX_BYTES.
+    """
+    if len(data) > settings.PROFILE_IMAGE_MAX_BYTES:
+        raise ValueError(f"Profile picture must be at most {settings.PROFILE_IMAGE_MAX_BYTES} bytes")
+    extension = image_format(data)
+    if extension is None:
+        raise ValueError("Profile picture must be a PNG, JPEG, GIF or WebP image")
+
+    digest = hashlib.sha256(data).hexdigest()
+    name = f"{digest[:2]}/{digest[2:4]}/{digest}.{extension}"
+    if image_path(name).exists():
+        return name
+
+    thumbnails = {}
+    if Image is not None:
+        # Decoding every size first also rejects corrupt images before anything is written
+        try:
+            for size in settings.PROFILE_IMAGE_THUMBNAIL_SIZES:
+                thumbnails[thumbnail_name(name, size)] = _thumbnail(data, size)
+        except (OSError, ValueError, Image.DecompressionBombError):
+            raise ValueError("Profile picture is not a valid image") from None
+
+    for thumbnail, thumbnail_data in thumbnails.items():
+        _write_atomic(image_path(thumbnail), thumbnail_data)
+    # The original is written last: its presence marks the image as complete
+    _write_atomic(image_path(name), data)
+    return name
+
+
+def ensure_thumbnail(name, size):
+    """Name of the ``size`` thumbnail of a stored image, generating it if missing; ``None`` without Pillow"""
+    thumbnail = thumbnail_name(name, size)
+    if image_path(thumbnail).exists():
+        return thumbnail
+    if Image is None:
+        return None
+    _write_atomic(image_path(thumbnail), _thumbnail(image_path(name).read_bytes(), size))
+    return thumbnail
+
+
+def is_stored_image_url(value):
+    return value.startswith(settings.PROFILE_IMAGE_URL) and bool(IMAGE_NAME.match(value[len(settings.PROFILE_IMAGE_URL):]))
+
+
+def check_picture_url(value):
+    """Raise ValueError unless ``value`` is a stored image URL or an http(s) URL of acceptable length"""
+    if is_stored_image_url(value):
+        return
+    if len(value) > settings.PROFILE_PICTURE_URL_MAX_LENGTH:
+        raise ValueError(f"Profile picture URLs must be at most {settings.PROFILE_PICTURE_URL_MAX_LENGTH} characters")
+    try:
+        validate_http_url(value)
+    except ValidationError:
+        raise ValueError("Profile picture must be an http(s) URL or a base64 image data URL") from None
+
+
+def decode_picture(value):
+    """Validate a profile picture value without storing anything.
+
+    Returns the decoded image of a base64 ``data:`` URL, or ``None`` for
+    values kept as they are: empty values, stored image URLs and http(s)
+    URLs. Raises ValueError for anything else and for malformed or
+    oversized data.
+    """
+    if not value:
+        return None
+    if not isinstance(value, str):
+        raise ValueError("Profile picture must be a string")
+    if not value.startswith("data:"):
+        check_picture_url(value)
+        return None
+
+    header, _, payload = value.partition(",")
+    if not header.endswith(";base64"):
+        raise ValueError("Profile picture data URLs must be base64 encoded")
+    # Reject oversized payloads before decoding them
+    if len(payload) * 3 // 4 > settings.PROFILE_IMAGE_MAX_BYTES:
+        raise ValueError(f"Profile picture must be at most {settings.PROFILE_IMAGE_MAX_BYTES} bytes")
+    try:
+        data = base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError("Profile picture is not valid base64") from None
+    if image_format(data) is None:
+        raise ValueError("Profile picture must be a PNG, JPEG, GIF or WebP image")
+    return data
+
+
+def externalize_picture(value):
+    """Replace an inline base64 ``data:`` URL with the URL of the stored image.
+
+    Other accepted values are returned unchanged, so the row only ever
+    holds a short reference. Raises ValueError like ``decode_picture`` and
+    ``store_image``.
+    """
+    data = decode_picture(value)
+    return value if data is None else image_url(store_image(data))
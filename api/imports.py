@@ -0,0 +1,189 @@
+import codecs
+import csv
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from .images import externalize_picture
+
+User = get_user_model()
+
+IMPORT_FORMATS = ("csv", "ndjson")
+IMPORT_FIELDS = ("username", "email", "password", "phone_number", "address",
+                 "profile_picture", "country", "city", "role")
+REQUIRED_FIELDS = ("username", "email", "password")
+
+
+def check_encoding(stream, encoding="utf-8-sig", chunk_size=64 * 1024):
+    """Raise UnicodeDecodeError unless the binary ``stream`` is valid ``encoding``, then rewind it.
+
+    Run before importing so a badly encoded file is rejected before any
+    row is written.
+    """
+    decoder = codecs.getincrementaldecoder(encoding)()
+    while chunk := stream.read(chunk_size):
+        decoder.decode(chunk)
+    decoder.decode(b"", final=True)
+    stream.seek(0)
+
+
+def parse_rows(stream, fmt):
+    """Yield ``(row, error)`` pairs from a text stream of CSV or NDJSON"""
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+    if fmt == "csv":
+        for row in csv.DictReader(stream):
+            yield row, None
+        return
+
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield None, "Invalid JSON"
+            continue
+        yield (row, None) if isinstance(row, dict) else (None, "Expected a JSON object")
+
+
+def validate_row(row):
+    """Field-level checks that need no database access"""
+    errors = {}
+    for field in IMPORT_FIELDS:
+        if row.get(field) is not None and not isinstance(row[field], str):
+            errors[field] = "Not a valid string."
+    if errors:
+        return errors
+
+    for field in REQUIRED_FIELDS:
+        if not row.get(field):
+            errors[field] = "This field is required."
+
+    for field in ("username", "phone_number"):
+        max_length = User._meta.get_field(field).max_length
+        if row.get(field) and len(row[field]) > max_length:
+            errors[field] = f"Ensure this field has no more than {max_length} characters."
+
+    if row.get("email"):
+        try:
+            validate_email(row["email"])
+        except ValidationError:
+            errors["email"] = "Enter a valid email address."
+    return errors
+
+
+class UserImporter:
+    """Set-based bulk registration of users.
+
+    Rows are processed ``batch_size`` at a time: uniqueness is checked with
+    one ``__in`` query per unique column, passwords are hashed on a thread
+    pool of its own (PBKDF2 releases the GIL) and valid rows are written
+    with a single ``bulk_create``. Every rejected row is reported with its
+    row number.
+
+    The pool is separate from the login/register hashing pool, whose size
+    is an admission limit for requests rather than a measure of the cores.
+    """
+    def __init__(self, batch_size=None, workers=None):
+        self.batch_size = batch_size or settings.USER_IMPORT_BATCH_SIZE
+        self.workers = workers or settings.USER_IMPORT_HASHING_WORKERS
+        self.created = 0
+        self.errors = []
+        self._seen_usernames = set()
+        self._seen_emails = set()
+
+    def run(self, rows):
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="import-hash") as pool:
+            batch = []
+            for number, (row, error) in enumerate(rows, start=1):
+                if error:
+                    self.errors.append({"row": number, "errors": {"non_field_errors": error}})
+                    continue
+                batch.append((number, row))
+                if len(batch) >= self.batch_size:
+                    self._import_batch(batch, pool)
+                    batch = []
+            if batch:
+                self._import_batch(batch, pool)
+
+        elapsed = time.monotonic() - started
+        return {
+            "created": self.created,
+            "failed": len(self.errors),
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+            "seconds": round(elapsed, 3),
+            "users_per_second": round(self.created / elapsed, 1) if elapsed else 0.0,
+        }
+
+    def _import_batch(self, batch, pool):
+        valid = []
+        for number, row in batch:
+            errors = validate_row(row)
+            if errors:
+                self.errors.append({"row": number, "errors": errors})
+            else:
+                valid.append((number, row))
+
+        usernames = {row["username"] for _, row in valid}
+        emails = {row["email"] for _, row in valid}
+        taken_usernames = set(User.objects.filter(username__in=usernames).values_list("username", flat=True))
+        taken_emails = set(User.objects.filter(email__in=emails).values_list("email", flat=True))
+
+        accepted = []
+        for number, row in valid:
+            errors = {}
+            if row["username"] in taken_usernames or row["username"] in self._seen_usernames:
+                errors["username"] = "Username is already taken."
+            if row["email"] in taken_emails or row["email"] in self._seen_emails:
+                errors["email"] = "A user with this email already exists."
+            if not errors:
+                # Last, so pictures are only stored for rows that passed every other check
+                try:
+                    row["profile_picture"] = externalize_picture(row.get("profile_picture"))
+                except ValueError as exc:
+                    errors["profile_picture"] = str(exc)
+            if errors:
+                self.errors.append({"row": number, "errors": errors})
+                continue
+            self._seen_usernames.add(row["username"])
+            self._seen_emails.add(row["email"])
+            accepted.append((number, row))
+
+        passwords = pool.map(make_password, [row["password"] for _, row in accepted])
+        users = [
+            (number, User(
+                **{field: row.get(field) or "" for field in IMPORT_FIELDS if field != "password"},
+                password=password,
+            ))
+            for (number, row), password in zip(accepted, passwords)
+        ]
+        self._insert(users)
+
+    def _insert(self, users):
+        try:
+            with transaction.atomic():
+                User.objects.bulk_create([user for _, user in users])
+            self.created += len(users)
+            return
+        except IntegrityError:
+            pass
+
+        # Another writer raced us on a unique column; save row by row to find out which
+        for number, user in users:
+            try:
+                with transaction.atomic():
+                    user.save(force_insert=True)
+                self.created += 1
+            except IntegrityError:
+                self.errors.append({"row": number, "errors": {"non_field_errors": "Username or email already exists."}})
@@ -0,0 +1,188 @@
+import json
+import random
+import subprocess
+import time
+import uuid
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+
+from api import hashing
+from api.benchmarking import (
+    SEED_PREFIX, HTTPLoadClient, InProcessLoadClient, bench_password, check_local_database, run_load, seed_users,
+)
+from api.throttling import SlidingWindowRateThrottle
+from api.token_writer import token_writer
+from api.views import get_tokens_for_user
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-test every auth/ and user/ endpoint and report throughput, latency percentiles "
+        "and DB queries per request. Runs in-process against the configured database "
+        "(e.g. DATABASE_URL=sqlite:///bench.sqlite3, or the docker-compose Postgres on port 5442) "
+        "or over HTTP against a running server with --url. The accounts it logs in with get a "
+        "random password and are deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000, help="Synthetic users to make sure exist")
+        parser.add_argument("--concurrency", type=int, default=8, help="Concurrent clients")
+        parser.add_argument("--requests", type=int, default=500, help="Requests per read scenario")
+        parser.add_argument("--write-requests", type=int, default=50,
+                            help="Requests per scenario that hashes passwords or writes (login, register, ...)")
+        parser.add_argument("--scenario", action="append", help="Only run these scenarios (repeatable)")
+        parser.add_argument("--url", help="Benchmark a running server at this base URL instead of in-process")
+        parser.add_argument("--no-queries", action="store_true", help="Do not count DB queries (in-process only)")
+        parser.add_argument("--token-write-behind", choices=["on", "off"],
+                            help="Override TOKEN_WRITE_BEHIND for this run (in-process only); compare runs with "
+                                 "-o/--compare, e.g. on the register, login, refresh_token and logout scenarios")
+        parser.add_argument("--allow-remote", action="store_true",
+                            help="Write benchmark users to a database that is neither SQLite nor on this host")
+        parser.add_argument("--output", "-o", help="Write the results as JSON to this file")
+        parser.add_argument("--compare", help="Print the change against an earlier --output file")
+
+    def handle(self, *args, **options):
+        if options["token_write_behind"]:
+            if options["url"]:
+                raise CommandError("--token-write-behind only applies to in-process runs")
+            token_writer.enabled = options["token_write_behind"] == "on"
+        check_local_database(options["allow_remote"])
+
+        seed_users(options["users"])
+        # Every account this run creates shares the prefix, so it can be removed afterwards
+        self.prefix = f"bench{uuid.uuid4().hex[:6]}_"
+        self.password = bench_password()
+        try:
+            self.run_scenarios(options)
+        finally:
+            User.objects.filter(username__startswith=self.prefix).delete()
+
+    def run_scenarios(self, options):
+        scenarios = self.build_scenarios(options["requests"], options["write_requests"])
+        if options["scenario"]:
+            unknown = set(options["scenario"]) - set(scenarios)
+            if unknown:
+                raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}. Choose from: {', '.join(scenarios)}")
+            scenarios = {name: scenarios[name] for name in options["scenario"]}
+
+        if options["url"]:
+            target = urlparse(options["url"])
+            make_client = lambda: HTTPLoadClient(target.hostname, target.port or 80)  # noqa: E731
+        else:
+            # Every login uses the same account; measure the endpoint, not the 429s
+            SlidingWindowRateThrottle.THROTTLE_RATES = {"login_ip": None, "login_username": None}
+            # One hashing slot per client, so login and register report latency rather than 503s
+            hashing.hashing_executor = hashing.PasswordHashingExecutor(workers=options["concurrency"], max_pending=0)
+            make_client = lambda: InProcessLoadClient(count_queries=not options["no_queries"])  # noqa: E731
+
+        results = {}
+        for name, (total, build_request) in scenarios.items():
+            summary = run_load(make_client, build_request, options["concurrency"], total).summary()
+            # Rows still queued by the write-behind buffer are part of this scenario's cost
+            flush_started = time.perf_counter()
+            if token_writer.flush():
+                summary["token_flush_ms"] = round((time.perf_counter() - flush_started) * 1000, 2)
+            results[name] = summary
+            queries = f"  queries/req {summary['queries_per_request']:>5}" if "queries_per_request" in summary else ""
+            self.stdout.write(
+                f"{name:18} {summary['rps']:>8} req/s  p50 {summary['p50_ms']:>8} ms  p95 {summary['p95_ms']:>8} ms  "
+                f"p99 {summary['p99_ms']:>8} ms  errors {summary['errors']}{queries}"
+            )
+
+        report = {
+            "meta": {
+                "commit": self.git_commit(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "target": options["url"] or "in-process",
+                "database": connection.vendor,
+                "users": User.objects.count(),
+                "concurrency": options["concurrency"],
+                "password_hashing_workers": hashing.hashing_executor.workers if not options["url"] else None,
+                "token_write_behind": token_writer.enabled if not options["url"] else None,
+            },
+            "scenarios": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w") as out:
+                json.dump(report, out, indent=2)
+        if options["compare"]:
+            self.compare(options["compare"], results)
+
+    def build_scenarios(self, reads, writes):
+        """Map scenario name to ``(request count, build_request)``"""
+        admin = User.objects.create_user(
+            username=f"{self.prefix}admin", email=f"{self.prefix}admin@example.com",
+            password=self.password, is_staff=True,
+        )
+        auth = {"Authorization": f"Bearer {get_tokens_for_user(admin)['access']}"}
+
+        seeded_ids = list(User.objects.filter(username__startswith=SEED_PREFIX).values_list("id", flat=True)[:1000])
+        random.seed(0)
+
+        # Refresh and logout consume their tokens, so every request gets a fresh pair
+        refresh_pairs = [get_tokens_for_user(admin) for _ in range(writes)]
+        logout_pairs = [get_tokens_for_user(admin) for _ in range(writes)]
+        prefix, password = self.prefix, self.password
+
+        def import_body(i):
+            rows = "".join(f"{prefix}imp{i}_{n},{prefix}imp{i}_{n}@example.com,{password}\n" for n in range(10))
+            upload = SimpleUploadedFile("users.csv", f"username,email,password\n{rows}".encode())
+            return encode_multipart(BOUNDARY, {"file": upload})
+
+        multipart = {**auth, "Content-Type": MULTIPART_CONTENT}
+        return {
+            "register": (writes, lambda i: ("POST", "/auth/register/", {
+                "username": f"{prefix}reg{i}", "email": f"{prefix}reg{i}@example.com", "password": password,
+            }, {})),
+            "login": (writes, lambda i: ("POST", "/auth/login/", {
+                "username": admin.username, "password": password,
+            }, {})),
+            "refresh_token": (writes, lambda i: ("POST", "/auth/refreshToken/", {
+                "refresh": refresh_pairs[i]["refresh"],
+            }, {})),
+            "logout": (writes, lambda i: ("POST", "/auth/logout/", {
+                "refresh_token": logout_pairs[i]["refresh"],
+            }, {"Authorization": f"Bearer {logout_pairs[i]['access']}"})),
+            "current_profile": (reads, lambda i: ("GET", "/user/", None, auth)),
+            "single_profile": (reads, lambda i: (
+                "GET", f"/user/single_profile/{random.choice(seeded_ids)}/", None, auth)),
+            "batch_profiles": (reads, lambda i: (
+                "GET", f"/user/profiles/?ids={','.join(map(str, random.sample(seeded_ids, 20)))}", None, auth)),
+            "all_users": (reads, lambda i: ("GET", "/user/all_users/?page_size=100", None, auth)),
+            "filtered_users": (reads, lambda i: ("GET", "/user/all_users/?city=Cairo&role=customer", None, auth)),
+            "search_users": (reads, lambda i: ("GET", f"/user/all_users/?search={SEED_PREFIX}{i % 100}", None, auth)),
+            "export_users": (max(1, writes // 10), lambda i: ("GET", "/user/export/", None, auth)),
+            "import_users": (max(1, writes // 10), lambda i: ("POST", "/user/import/", import_body(i), multipart)),
+            "swagger_json": (max(1, writes // 5), lambda i: ("GET", "/swagger.json/", None, {})),
+        }
+
+    def compare(self, path, results):
+        with open(path) as baseline_file:
+            baseline = json.load(baseline_file)["scenarios"]
+
+        self.stdout.write(f"\nChange against {path}:")
+        for name, summary in results.items():
+            if name not in baseline:
+                continue
+            before = baseline[name]
+            rps = (summary["rps"] - before["rps"]) / before["rps"] * 100 if before["rps"] else 0.0
+            p99 = (summary["p99_ms"] - before["p99_ms"]) / before["p99_ms"] * 100 if before["p99_ms"] else 0.0
+            self.stdout.write(f"{name:18} rps {rps:+7.1f}%  p99 {p99:+7.1f}%")
+
+    @staticmethod
+    def git_commit():
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR,
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
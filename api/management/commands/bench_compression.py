@@ -0,0 +1,119 @@
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.authentication import IDENTITY_CLAIMS
+from api.compression import ENCODINGS, compress, decompress
+from api.management.commands.bench_json import best_of, synthetic_users
+from api.renderers import dumps
+from api.serializers import user_to_dict
+from api.sessions import GENERATION_CLAIM
+
+# Levels compared for each coding; the configured ones are always included
+LEVELS = {"gzip": (1, 6, 9), "br": (1, 4, 6, 11)}
+
+
+def tokens_payload(user):
+    refresh = RefreshToken()
+    refresh[jwt_settings.USER_ID_CLAIM] = user.id
+    for claim in IDENTITY_CLAIMS:
+        refresh[claim] = getattr(user, claim)
+    refresh[GENERATION_CLAIM] = 0
+    return {"user_id": user.id, "tokens": {"access": str(refresh.access_token), "refresh": str(refresh)}}
+
+
+def page_payload(users):
+    return {
+        "next": "https://api.example.com/user/all_users/?cursor=cD0xMDA%3D",
+        "previous": None,
+        "results": [user_to_dict(user) for user in users],
+    }
+
+
+def schema_payload():
+    """The served OpenAPI document, or ``None`` when the API docs are disabled"""
+    if not settings.API_DOCS_ENABLED:
+        return None
+    hosts = [host for host in settings.ALLOWED_HOSTS if not host.startswith(".") and "*" not in host]
+    client = Client(HTTP_HOST=hosts[0] if hosts else "localhost")
+    response = client.get(reverse("schema-json"), HTTP_ACCEPT="application/json")
+    return response.content if response.status_code == 200 else None
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare gzip and brotli levels on representative API JSON payloads: compressed size "
+        "against compression CPU time, and the resulting time to send each body over a slow link"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--link-kbps", type=float, default=1600,
+                            help="Link speed used to estimate transfer time (default: a slow mobile link)")
+        parser.add_argument("--output", "-o", help="Write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        if options["link_kbps"] <= 0:
+            raise CommandError("--link-kbps must be positive")
+
+        users = synthetic_users(settings.USER_LIST_MAX_PAGE_SIZE)
+        payloads = {
+            "login tokens": dumps(tokens_payload(users[1])),
+            "single profile": dumps(user_to_dict(users[1])),
+            f"all_users page ({settings.USER_LIST_PAGE_SIZE})": dumps(page_payload(users[:settings.USER_LIST_PAGE_SIZE])),
+            f"all_users page ({settings.USER_LIST_MAX_PAGE_SIZE})": dumps(page_payload(users)),
+        }
+        schema = schema_payload()
+        if schema is not None:
+            payloads["swagger.json"] = schema
+
+        configured = {"gzip": settings.RESPONSE_COMPRESSION_GZIP_LEVEL, "br": settings.RESPONSE_COMPRESSION_BROTLI_QUALITY}
+        variants = [("identity", None)] + [
+            (coding, level)
+            for coding in ENCODINGS
+            for level in sorted({*LEVELS[coding], configured[coding]})
+        ]
+        bytes_per_ms = options["link_kbps"] * 1000 / 8 / 1000
+
+        self.stdout.write(
+            f"codings: {', '.join(ENCODINGS)}; threshold {settings.RESPONSE_COMPRESSION_MIN_BYTES} bytes; "
+            f"transfer estimated at {options['link_kbps']:g} kbps"
+        )
+        results = {}
+        for name, body in payloads.items():
+            skipped = len(body) < settings.RESPONSE_COMPRESSION_MIN_BYTES
+            self.stdout.write(f"\n{name}: {len(body)} bytes{' (below threshold, sent as is)' if skipped else ''}")
+            results[name] = {"bytes": len(body), "below_threshold": skipped, "variants": {}}
+            for coding, level in variants:
+                if coding == "identity":
+                    size, best, median = len(body), 0.0, 0.0
+                else:
+                    compressed = compress(body, coding, level)
+                    assert decompress(compressed, coding) == body
+                    size = len(compressed)
+                    best, median = best_of(options["repeat"], lambda: compress(body, coding, level))
+                transfer = size / bytes_per_ms
+                label = coding if level is None else f"{coding}-{level}"
+                marker = " *" if level is not None and level == configured[coding] else ""
+                results[name]["variants"][label] = {
+                    "bytes": size,
+                    "ratio": round(size / len(body), 3),
+                    "compress_best_ms": round(best, 3),
+                    "compress_median_ms": round(median, 3),
+                    "transfer_ms": round(transfer, 1),
+                    "total_ms": round(median + transfer, 1),
+                }
+                self.stdout.write(
+                    f"  {label + marker:12} {size:>9} bytes  ratio {size / len(body):5.3f}  "
+                    f"compress {median:>8.3f} ms  transfer {transfer:>8.1f} ms  total {median + transfer:>8.1f} ms"
+                )
+        self.stdout.write("\n* configured level")
+
+        if options["output"]:
+            with open(options["output"], "w") as out:
+                json.dump(results, out, indent=2)
@@ -0,0 +1,77 @@
+import json
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import FastJSONRenderer, orjson
+from api.serializers import UserSerializer, user_to_dict
+
+User = get_user_model()
+
+
+def synthetic_users(count):
+    return [
+        User(
+            id=n,
+            username=f"user_{n}",
+            email=f"user_{n}@example.com",
+            phone_number=f"+20{n:010d}",
+            address=f"{n} Nile Corniche, Apartment {n % 40}",
+            profile_picture=f"https://cdn.example.com/avatars/{n}.png",
+            country="Egypt",
+            city="Cairo",
+            role="customer",
+            is_active=True,
+            is_staff=False,
+        )
+        for n in range(count)
+    ]
+
+
+def best_of(repeat, fn):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return min(timings), statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = "Microbenchmark user serialization and JSON rendering on an in-memory payload"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000)
+        parser.add_argument("--repeat", type=int, default=10)
+        parser.add_argument("--output", "-o", help="Write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        users = synthetic_users(options["rows"])
+        rows = [user_to_dict(user) for user in users]
+        serializer_rows = UserSerializer(users, many=True).data
+        assert list(serializer_rows) == rows, "user_to_dict must match UserSerializer"
+
+        cases = {
+            "serialize: UserSerializer(many=True)": lambda: UserSerializer(users, many=True).data,
+            "serialize: user_to_dict": lambda: [user_to_dict(user) for user in users],
+            "render: DRF JSONRenderer": lambda: JSONRenderer().render(rows),
+            "render: FastJSONRenderer": lambda: FastJSONRenderer().render(rows),
+            "end to end: UserSerializer + JSONRenderer":
+                lambda: JSONRenderer().render(UserSerializer(users, many=True).data),
+            "end to end: user_to_dict + FastJSONRenderer":
+                lambda: FastJSONRenderer().render([user_to_dict(user) for user in users]),
+        }
+
+        self.stdout.write(f"{options['rows']} rows, orjson {'available' if orjson else 'NOT installed (fallback)'}")
+        results = {}
+        for name, fn in cases.items():
+            best, median = best_of(options["repeat"], fn)
+            results[name] = {"best_ms": round(best, 2), "median_ms": round(median, 2)}
+            self.stdout.write(f"{name:45} best {best:>9.2f} ms  median {median:>9.2f} ms")
+
+        if options["output"]:
+            with open(options["output"], "w") as out:
+                json.dump(results, out, indent=2)
@@ -0,0 +1,99 @@
+import json
+import os
+import subprocess
+import sys
+import uuid
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from api.benchmarking import HTTPLoadClient, bench_password, check_local_database, run_load, wait_for_port
+from api.views import get_tokens_for_user
+
+User = get_user_model()
+
+HOST = "127.0.0.1"
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests/s and latency of the API under gunicorn (WSGI) and uvicorn (ASGI, async views). "
+        "The account it logs in with gets a random password and is deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=2, help="Server worker processes")
+        parser.add_argument("--threads", type=int, default=8, help="gunicorn threads per worker")
+        parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients")
+        parser.add_argument("--requests", type=int, default=2000, help="Requests per read scenario")
+        parser.add_argument("--login-requests", type=int, default=100, help="Requests for the login scenario (each one hashes)")
+        parser.add_argument("--port", type=int, default=8100, help="First port to bind servers on")
+        parser.add_argument("--allow-remote", action="store_true",
+                            help="Write the benchmark user to a database that is neither SQLite nor on this host")
+        parser.add_argument("--output", "-o", help="Write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        check_local_database(options["allow_remote"])
+        username, password = f"bench{uuid.uuid4().hex[:6]}_user", bench_password()
+        user = User.objects.create_user(username=username, email=f"{username}@example.com", password=password)
+        try:
+            self.run_servers(options, user, password)
+        finally:
+            user.delete()
+
+    def run_servers(self, options, user, password):
+        access = get_tokens_for_user(user)["access"]
+        auth = {"Authorization": f"Bearer {access}"}
+
+        login = {"username": user.username, "password": password}
+        scenarios = {
+            "profile": (lambda i: ("GET", "/user/", None, auth), options["requests"]),
+            "single_profile": (lambda i: ("GET", f"/user/single_profile/{user.id}/", None, auth), options["requests"]),
+            "login": (lambda i: ("POST", "/auth/login/", login, {}), options["login_requests"]),
+        }
+        servers = {
+            "gunicorn": (
+                [sys.executable, "-m", "gunicorn", "troviny.wsgi:application", "-k", "gthread",
+                 "--workers", str(options["workers"]), "--threads", str(options["threads"]),
+                 "--bind", f"{HOST}:{options['port']}"],
+                options["port"],
+                # Lets settings size the per-worker hashing pool for this layout
+                {"ASYNC_API_VIEWS": "0", "WEB_CONCURRENCY": str(options["workers"]),
+                 "GUNICORN_THREADS": str(options["threads"])},
+            ),
+            "uvicorn": (
+                [sys.executable, "-m", "uvicorn", "troviny.asgi:application", "--no-access-log",
+                 "--workers", str(options["workers"]), "--host", HOST, "--port", str(options["port"] + 1)],
+                options["port"] + 1, {"ASYNC_API_VIEWS": "1", "WEB_CONCURRENCY": str(options["workers"])},
+            ),
+        }
+
+        results = {}
+        for name, (command, port, env) in servers.items():
+            process = subprocess.Popen(
+                command, cwd=settings.BASE_DIR, env={**os.environ, **env},
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+            try:
+                if not wait_for_port(HOST, port):
+                    raise CommandError(f"{name} did not start on port {port}")
+                results[name] = {}
+                for scenario, (build_request, total) in scenarios.items():
+                    result = run_load(lambda: HTTPLoadClient(HOST, port), build_request, options["concurrency"], total)
+                    results[name][scenario] = result.summary()
+                    self.stdout.write(f"{name:9} {scenario:15} {self.format_summary(results[name][scenario])}")
+            finally:
+                process.terminate()
+                process.wait()
+
+        if options["output"]:
+            with open(options["output"], "w") as out:
+                json.dump(results, out, indent=2)
+
+    @staticmethod
+    def format_summary(summary):
+        return (
+            f"{summary['rps']:>9} req/s  p50 {summary['p50_ms']:>8} ms  "
+            f"p99 {summary['p99_ms']:>8} ms  errors {summary['errors']}"
+        )
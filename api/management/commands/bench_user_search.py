@@ -0,0 +1,86 @@
+import json
+import re
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from api.benchmarking import SEED_PREFIX, check_local_database, seed_users
+from api.filters import SEARCH_FIELDS, filter_users
+
+User = get_user_model()
+
+# Indexes created by migration 0004; the trigram ones exist on PostgreSQL only
+TRIGRAM_INDEXES = tuple(f"api_user_{field}_trgm_idx" for field in SEARCH_FIELDS)
+
+# Case name -> (query parameters, indexes any of which the plan should use).
+# Cases without indexes of their own are timed but not checked.
+CASES = {
+    "first_page": ({}, ()),
+    "role": ({"role": "vendor"}, ("api_user_role_id_idx",)),
+    "country": ({"country": "Kenya"}, ("api_user_country_id_idx",)),
+    "city": ({"city": "Luxor"}, ("api_user_city_id_idx",)),
+    "city_and_role": ({"city": "Luxor", "role": "admin"}, ("api_user_city_id_idx", "api_user_role_id_idx")),
+    "inactive": ({"is_active": "false"}, ()),
+    "search_prefix": ({"search": f"{SEED_PREFIX}1234", "search_mode": "prefix"}, TRIGRAM_INDEXES),
+    "search_contains": ({"search": "01234"}, TRIGRAM_INDEXES),
+}
+
+
+def uses_expected_index(explain, expected, vendor):
+    """Whether the plan names one of ``expected``; ``None`` when the case has no index to check here"""
+    if vendor != "postgresql":
+        expected = tuple(name for name in expected if name not in TRIGRAM_INDEXES)
+    if not expected:
+        return None
+    return any(re.search(rf"\b{name}\b", explain) for name in expected)
+
+
+class Command(BaseCommand):
+    help = "Seed a synthetic user table and time/EXPLAIN the user listing filters and search"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100_000, help="Synthetic users to make sure exist")
+        parser.add_argument("--page-size", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=20, help="Timed runs per query")
+        parser.add_argument("--allow-remote", action="store_true",
+                            help="Seed a database that is neither SQLite nor on this host")
+        parser.add_argument("--output", "-o", help="Write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        check_local_database(options["allow_remote"])
+        added = seed_users(options["users"])
+        self.stdout.write(f"Seeded {added} users ({User.objects.count()} total) on {connection.vendor}")
+        results = {}
+        for name, (params, expected) in CASES.items():
+            queryset = filter_users(User.objects.values("id", "username", "email"), params)
+            queryset = queryset.order_by("id")[:options["page_size"]]
+
+            timings = []
+            for _ in range(options["repeat"]):
+                started = time.perf_counter()
+                list(queryset.all())  # fresh clone, so the result cache is not reused
+                timings.append((time.perf_counter() - started) * 1000)
+
+            explain = queryset.explain(analyze=True) if connection.vendor == "postgresql" else queryset.explain()
+            results[name] = {
+                "params": params,
+                "median_ms": round(statistics.median(timings), 3),
+                "uses_index": uses_expected_index(explain, expected, connection.vendor),
+                "indexes": sorted(set(re.findall(r"\b(api_user\w*_idx|api_usermodel_pkey)\b", explain))),
+                "plan": explain,
+            }
+            self.stdout.write(
+                f"{name:16} {results[name]['median_ms']:>9} ms  "
+                f"index={self.index_label(results[name]['uses_index']):3}  {', '.join(results[name]['indexes'])}"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w") as out:
+                json.dump(results, out, indent=2)
+
+    @staticmethod
+    def index_label(uses_index):
+        return "-" if uses_index is None else "yes" if uses_index else "no"
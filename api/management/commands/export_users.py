@@ -0,0 +1,31 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.exports import EXPORT_FORMATS, ExportStats, iter_export_lines
+
+
+class Command(BaseCommand):
+    help = "Stream every user as NDJSON or CSV in constant memory"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="ndjson")
+        parser.add_argument("--output", "-o", help="File to write to (defaults to stdout)")
+        parser.add_argument("--chunk-size", type=int, default=None, help="Rows fetched per cursor round trip")
+
+    def handle(self, *args, **options):
+        stats = ExportStats()
+        lines = iter_export_lines(options["format"], options["chunk_size"], stats)
+
+        try:
+            if options["output"]:
+                with open(options["output"], "w", newline="") as out:
+                    out.writelines(lines)
+            else:
+                for line in lines:
+                    self.stdout.write(line, ending="")
+        except OSError as exc:
+            raise CommandError(str(exc)) from exc
+
+        # Report on stderr so the export itself can be piped
+        self.stderr.write(json.dumps(stats.summary()))
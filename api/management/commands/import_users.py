@@ -0,0 +1,42 @@
+import io
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.imports import IMPORT_FORMATS, UserImporter, check_encoding, parse_rows
+
+
+class Command(BaseCommand):
+    help = "Bulk register users from a CSV or NDJSON file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV (with a header row) or NDJSON file")
+        parser.add_argument("--format", choices=IMPORT_FORMATS, help="Defaults to the file extension")
+        parser.add_argument("--batch-size", type=int, default=None, help="Rows validated and inserted per batch")
+        parser.add_argument("--workers", type=int, default=None, help="Password hashing threads (defaults to the CPU count)")
+        parser.add_argument("--report", help="Write the full per-row error report as JSON to this file")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"] or ("csv" if path.endswith(".csv") else "ndjson")
+
+        try:
+            with open(path, "rb") as raw:
+                check_encoding(raw)
+                stream = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+                report = UserImporter(options["batch_size"], options["workers"]).run(parse_rows(stream, fmt))
+        except OSError as exc:
+            raise CommandError(str(exc)) from exc
+        except UnicodeDecodeError as exc:
+            raise CommandError(f"{path} is not UTF-8 encoded: {exc}") from exc
+
+        if options["report"]:
+            with open(options["report"], "w") as out:
+                json.dump(report, out, indent=2)
+
+        self.stdout.write(
+            f"Created {report['created']} users, {report['failed']} rows failed "
+            f"in {report['seconds']}s ({report['users_per_second']} users/s)"
+        )
+        for error in report["errors"][:20]:
+            self.stderr.write(f"row {error['row']}: {error['errors']}")
@@ -0,0 +1,48 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from api.images import externalize_picture
+from api.profile_cache import profile_cache_key
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Move profile pictures stored inline as base64 data URLs into the image store"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200, help="Users loaded and updated per batch")
+        parser.add_argument("--dry-run", action="store_true", help="Count the inline pictures without changing anything")
+
+    def handle(self, *args, **options):
+        inline = User.objects.filter(profile_picture__startswith="data:").order_by("id")
+        if options["dry_run"]:
+            self.stdout.write(f"{inline.count()} users have an inline profile picture")
+            return
+
+        migrated = failed = 0
+        last_id = 0
+        while True:
+            # Keyset pagination: only one batch of (large) pictures is in memory at a time
+            users = list(inline.filter(id__gt=last_id).only("id", "profile_picture")[:options["batch_size"]])
+            if not users:
+                break
+            last_id = users[-1].id
+
+            changed = []
+            for user in users:
+                try:
+                    user.profile_picture = externalize_picture(user.profile_picture)
+                except ValueError as exc:
+                    failed += 1
+                    self.stderr.write(f"User {user.id}: {exc}")
+                    continue
+                user.updated_on = now()
+                changed.append(user)
+            User.objects.bulk_update(changed, ["profile_picture", "updated_on"])
+            cache.delete_many([profile_cache_key(user.id) for user in changed])
+            migrated += len(changed)
+
+        self.stdout.write(f"Migrated {migrated} profile pictures, {failed} could not be converted")
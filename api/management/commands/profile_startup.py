@@ -0,0 +1,85 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter so nothing is already imported
+CHILD_SCRIPT = """
+import json, os, sys, time
+started = time.perf_counter()
+import {module}
+timings = {{"import": time.perf_counter() - started}}
+if {warm_up}:
+    from troviny.warmup import warm_up
+    timings.update(warm_up())
+print(json.dumps(timings))
+"""
+
+
+def parse_importtime(stderr):
+    """``(module, self_us, cumulative_us)`` for each line of ``-X importtime`` output"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+
+class Command(BaseCommand):
+    help = "Profile worker start-up: per-module import cost of the WSGI application and warm-up steps"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--module", default="troviny.wsgi", help="Module to import (default: troviny.wsgi)")
+        parser.add_argument("--limit", type=int, default=25, help="Rows to show per table")
+        parser.add_argument("--warm-up", action="store_true", help="Also time troviny.warmup.warm_up()")
+        parser.add_argument("--output", "-o", help="Write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get("DJANGO_SETTINGS_MODULE", "troviny.settings"))
+        # Time the warm-up explicitly rather than as a side effect of the import
+        env["WARM_UP_ON_LOAD"] = "0"
+        script = CHILD_SCRIPT.format(module=options["module"], warm_up=options["warm_up"])
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", script],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(result.stderr.strip().splitlines()[-1])
+
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+        modules = parse_importtime(result.stderr)
+        packages = defaultdict(int)
+        for name, self_us, _ in modules:
+            packages[name.split(".")[0]] += self_us
+
+        limit = options["limit"]
+        self.stdout.write(f"import {options['module']:20} {timings['import'] * 1000:>9.1f} ms  ({len(modules)} modules loaded in total)")
+        for step, seconds in timings.items():
+            if step != "import":
+                self.stdout.write(f"  warm-up {step:20} {seconds * 1000:>9.1f} ms")
+
+        self.stdout.write(f"\nTop {limit} packages by import time (self time summed over their modules)")
+        for package, self_us in sorted(packages.items(), key=lambda item: -item[1])[:limit]:
+            self.stdout.write(f"  {package:40} {self_us / 1000:>9.1f} ms")
+
+        self.stdout.write(f"\nTop {limit} modules by cumulative import time")
+        for name, self_us, cumulative_us in sorted(modules, key=lambda item: -item[2])[:limit]:
+            self.stdout.write(f"  {name:60} {cumulative_us / 1000:>9.1f} ms  (self {self_us / 1000:.1f} ms)")
+
+        if options["output"]:
+            with open(options["output"], "w") as out:
+                json.dump({
+                    "module": options["module"],
+                    "timings_ms": {step: round(seconds * 1000, 2) for step, seconds in timings.items()},
+                    "packages_ms": {package: round(self_us / 1000, 2) for package, self_us in packages.items()},
+                    "modules": [
+                        {"module": name, "self_ms": round(self_us / 1000, 2), "cumulative_ms": round(cumulative_us / 1000, 2)}
+                        for name, self_us, cumulative_us in modules
+                    ],
+                }, out, indent=2)
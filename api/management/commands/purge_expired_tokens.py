@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken as JWTBlacklistedToken
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+
+from api.models import BlacklistedToken
+
+
+def purge_in_batches(queryset, batch_size, pause):
+    """Delete the rows of ``queryset`` one primary-key batch at a time.
+
+    Each batch is its own short DELETE ... WHERE id IN (...) statement, so
+    row locks are held briefly and concurrent inserts are never blocked on
+    a long-running table-wide delete.
+    """
+    model = queryset.model
+    deleted = 0
+    while True:
+        pks = list(queryset.values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        model.objects.filter(pk__in=pks).delete()
+        deleted += len(pks)
+        if pause:
+            time.sleep(pause)
+
+
+class Command(BaseCommand):
+    help = "Delete expired revoked/outstanding JWT rows in small batches (safe to run from cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=5000, help="Rows deleted per statement")
+        parser.add_argument("--pause", type=float, default=0.05, help="Seconds to sleep between batches")
+
+    def handle(self, *args, **options):
+        cutoff = now()
+        batch_size = options["batch_size"]
+        pause = options["pause"]
+
+        # simplejwt's blacklist rows reference OutstandingToken, so they go first
+        querysets = [
+            ("api.BlacklistedToken", BlacklistedToken.objects.filter(expires_at__lte=cutoff)),
+            ("token_blacklist.BlacklistedToken", JWTBlacklistedToken.objects.filter(token__expires_at__lte=cutoff)),
+            ("token_blacklist.OutstandingToken", OutstandingToken.objects.filter(expires_at__lte=cutoff)),
+        ]
+        for label, queryset in querysets:
+            deleted = purge_in_batches(queryset, batch_size, pause)
+            self.stdout.write(f"{label}: deleted {deleted} expired rows")
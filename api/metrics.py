@@ -0,0 +1,156 @@
+"""In-process request metrics rendered in the Prometheus text format.
+
+Every worker process keeps its own counters, so with several gunicorn
+workers each scrape of ``/metrics`` reports the worker that answered it;
+scrape every pod/worker or aggregate in Prometheus.
+"""
+import bisect
+import threading
+from contextvars import ContextVar
+
+# Per-request timings collected by RequestMetricsMiddleware and the code it calls
+_request_timings = ContextVar("request_timings", default=None)
+
+
+def start_request_timings():
+    return _request_timings.set({})
+
+
+def finish_request_timings(token):
+    timings = _request_timings.get()
+    _request_timings.reset(token)
+    return timings or {}
+
+
+def record_timing(name, seconds):
+    """Add ``seconds`` to the named phase of the current request, if it is being measured"""
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class Histogram:
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0, 0.0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += 1
+            series[2] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = {labels: (list(counts), count, total) for labels, (counts, count, total) in self._series.items()}
+        for label_values, (counts, count, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels, label_values, [("le", repr(float(bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, label_values, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, label_values)} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, label_values)} {total}")
+        return lines
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "Wall time spent handling a request", ("view", "method"), LATENCY_BUCKETS,
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "Database queries executed per request", ("view",), QUERY_BUCKETS,
+)
+REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds", "Time spent in database queries per request", ("view",), LATENCY_BUCKETS,
+)
+REQUEST_PHASE_DURATION = Histogram(
+    "http_request_phase_duration_seconds", "Time spent per request in password hashing and rendering",
+    ("view", "phase"), LATENCY_BUCKETS,
+)
+HISTOGRAMS = (REQUEST_DURATION, REQUEST_DB_QUERIES, REQUEST_DB_DURATION, REQUEST_PHASE_DURATION)
+
+
+def render_metrics():
+    """All metrics of this process in the Prometheus text exposition format"""
+    from .hashing import hashing_executor
+
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+
+    hashing = hashing_executor.snapshot()
+    for name, kind, key, documentation in (
+        ("password_hash_queue_depth", "gauge", "queue_depth", "Password hashes running or waiting"),
+        ("password_hash_total", "counter", "hashes", "Password hashes computed"),
+        ("password_hash_seconds_total", "counter", "hash_seconds_total", "Time spent computing password hashes"),
+        ("password_hash_rejected_total", "counter", "rejected", "Requests rejected because the hashing queue was full"),
+    ):
+        lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}", f"{name} {hashing[key]}"]
+
+    from .token_writer import token_writer
+
+    name = "token_write_behind_pending"
+    lines += [f"# HELP {name} Token bookkeeping rows queued for the next batched insert",
+              f"# TYPE {name} gauge", f"{name} {token_writer.pending()}"]
+
+    lines.extend(_render_pool_metrics())
+    return "\n".join(lines) + "\n"
+
+
+POOL_METRICS = (
+    ("db_pool_size", "gauge", "pool_size", "Connections currently managed by the pool"),
+    ("db_pool_max_size", "gauge", "pool_max", "Upper bound on pool connections"),
+    ("db_pool_available", "gauge", "pool_available", "Idle connections ready to be handed out"),
+    ("db_pool_requests_waiting", "gauge", "requests_waiting", "Requests waiting for a connection"),
+    ("db_pool_requests_total", "counter", "requests_num", "Connection requests served by the pool"),
+    ("db_pool_requests_queued_total", "counter", "requests_queued", "Connection requests that had to wait"),
+    ("db_pool_requests_wait_seconds_total", "counter", "requests_wait_ms", "Time spent waiting for a connection"),
+    ("db_pool_requests_errors_total", "counter", "requests_errors", "Connection requests that timed out or failed"),
+    ("db_pool_connections_lost_total", "counter", "connections_lost", "Broken connections discarded by health checks"),
+    ("db_pool_connections_errors_total", "counter", "connections_errors", "Failed attempts to open a connection"),
+)
+
+
+def _render_pool_metrics():
+    """psycopg pool statistics for every database alias that has a pool"""
+    from django.db import connections
+
+    stats = {}
+    for connection in connections.all():
+        pool = getattr(connection, "pool", None)
+        if pool is not None:
+            stats[connection.alias] = pool.get_stats()
+    if not stats:
+        return []
+
+    lines = []
+    for name, kind, key, documentation in POOL_METRICS:
+        lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+        for alias, values in sorted(stats.items()):
+            value = values.get(key, 0)
+            if key.endswith("_ms"):
+                value = value / 1000
+            lines.append(f"{name}{_format_labels(('database',), (alias,))} {value}")
+    return lines
@@ -1,20 +1,241 @@
+import random
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
 from django.http import JsonResponse
-from .models import BlacklistedToken
-from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.utils.cache import patch_vary_headers
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from . import metrics
+from .authentication import SharedJWTAuthentication
+from .compression import compress, negotiate
+from .revocation import revocation_cache
+from .sessions import ais_stale, is_stale
+
+jwt_authentication = SharedJWTAuthentication()
+
+
+class QueryCounter:
+    """``connection.execute_wrapper`` that counts queries and their time"""
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+
+
+class RequestMetricsMiddleware:
+    """Record wall time, DB queries and DB time of each request.
+
+    Results go to the ``/metrics`` histograms (labelled by URL name) and to
+    a ``Server-Timing`` response header. Only a REQUEST_METRICS_SAMPLE_RATE
+    fraction of requests is measured; the rest pass straight through. Under
+    ASGI, ORM calls run on other threads, so only total, hashing and render
+    times are recorded there.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.REQUEST_METRICS_SAMPLE_RATE
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        counter = QueryCounter()
+        token = metrics.start_request_timings()
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(counter))
+                response = self.get_response(request)
+        finally:
+            timings = metrics.finish_request_timings(token)
+        return self.record(request, response, time.perf_counter() - started, timings, counter)
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        token = metrics.start_request_timings()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timings = metrics.finish_request_timings(token)
+        return self.record(request, response, time.perf_counter() - started, timings, None)
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; time that step too
+        render_started = time.perf_counter()
+        response.add_post_render_callback(
+            lambda rendered: metrics.record_timing("render", time.perf_counter() - render_started)
+        )
+        return response
+
+    def sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    @staticmethod
+    def record(request, response, elapsed, timings, counter):
+        match = getattr(request, "resolver_match", None)
+        view = (match.view_name or match.route) if match else "unresolved"
+
+        metrics.REQUEST_DURATION.observe((view, request.method), elapsed)
+        server_timing = [f"total;dur={elapsed * 1000:.2f}"]
+        if counter is not None:
+            metrics.REQUEST_DB_QUERIES.observe((view,), counter.count)
+            metrics.REQUEST_DB_DURATION.observe((view,), counter.seconds)
+            server_timing.append(f'db;dur={counter.seconds * 1000:.2f};desc="{counter.count} queries"')
+        for phase, seconds in timings.items():
+            metrics.REQUEST_PHASE_DURATION.observe((view, phase), seconds)
+            server_timing.append(f"{phase};dur={seconds * 1000:.2f}")
+
+        response["Server-Timing"] = ", ".join(server_timing)
+        return response
+
+
+class CompressionMiddleware:
+    """Compress JSON responses with brotli or gzip, as negotiated from Accept-Encoding.
+
+    Only RESPONSE_COMPRESSION_CONTENT_TYPES and ``+json`` bodies of at least
+    RESPONSE_COMPRESSION_MIN_BYTES are compressed. Those responses always
+    get ``Vary: Accept-Encoding``, including when they are sent as they
+    are, so shared caches keep the variants apart. A compressed response's
+    strong ETag is made weak, as Django's GZipMiddleware does; the
+    conditional checks in the views compare ETags weakly, so clients can
+    still revalidate. Static files are left to WhiteNoise, which serves
+    them pre-compressed.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.min_bytes = settings.RESPONSE_COMPRESSION_MIN_BYTES
+        self.levels = {"br": settings.RESPONSE_COMPRESSION_BROTLI_QUALITY, "gzip": settings.RESPONSE_COMPRESSION_GZIP_LEVEL}
+        self.content_types = frozenset(settings.RESPONSE_COMPRESSION_CONTENT_TYPES)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header("Content-Encoding"):
+            return response
+        content_type = response.get("Content-Type", "").split(";")[0].strip().lower()
+        if not self.compressible(content_type) or len(response.content) < self.min_bytes:
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        coding = negotiate(request.headers.get("Accept-Encoding"))
+        if coding is None:
+            return response
+        compressed = compress(response.content, coding, self.levels[coding])
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+        response["Content-Encoding"] = coding
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        return response
+
+    def compressible(self, content_type):
+        return content_type in self.content_types or content_type.endswith("+json")
+
 
 class BlacklistAccessTokenMiddleware:
-    """Middleware to reject blacklisted access tokens"""
+    """Middleware to reject blacklisted access tokens and ended sessions
+
+    Lookups go through the per-process revocation cache, so a logout made in
+    another worker takes effect within TOKEN_REVOCATION_CACHE_REFRESH_SECONDS.
+    Tokens older than their user's session generation ("log out everywhere")
+    are rejected through a cached per-user lookup. Runs natively under both
+    WSGI and ASGI. The parsed and validated bearer token is left on
+    ``request.jwt_raw_token`` and ``request.jwt_validated_token`` for
+    SharedJWTAuthentication; invalid tokens are left for it to reject.
+    """
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
         auth_header = request.headers.get("Authorization")
         if auth_header:
             try:
-                access_token = auth_header.split(" ")[1]
-                if BlacklistedToken.objects.filter(token=access_token).exists():
+                auth_type, access_token = auth_header.split(" ")[:2]
+                if auth_type in jwt_settings.AUTH_HEADER_TYPES:
+                    request.jwt_raw_token = access_token
+                if revocation_cache.is_revoked(access_token):
                     return JsonResponse({"error": "Invalid token, please log in again"}, status=401)
-            except IndexError:
+            except ValueError:
                 return JsonResponse({"error": "Invalid token format"}, status=401)
 
+            token = self.validated_token(request)
+            if token is not None and is_stale(token):
+                return JsonResponse({"error": "Session ended, please log in again"}, status=401)
+
         return self.get_response(request)
+
+    async def __acall__(self, request):
+        auth_header = request.headers.get("Authorization")
+        if auth_header:
+            try:
+                auth_type, access_token = auth_header.split(" ")[:2]
+                if auth_type in jwt_settings.AUTH_HEADER_TYPES:
+                    request.jwt_raw_token = access_token
+                if await revocation_cache.ais_revoked(access_token):
+                    return JsonResponse({"error": "Invalid token, please log in again"}, status=401)
+            except ValueError:
+                return JsonResponse({"error": "Invalid token format"}, status=401)
+
+            token = self.validated_token(request)
+            if token is not None and await ais_stale(token):
+                return JsonResponse({"error": "Session ended, please log in again"}, status=401)
+
+        return await self.get_response(request)
+
+    @staticmethod
+    def validated_token(request):
+        """Decode the bearer token once for the whole request; ``None`` unless it is a valid access token"""
+        raw_token = getattr(request, "jwt_raw_token", None)
+        if raw_token is None:
+            return None
+        try:
+            token = jwt_authentication.get_validated_token(raw_token)
+        except InvalidToken:
+            return None
+        request.jwt_validated_token = token
+        return token
@@ -0,0 +1,64 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:00
+
+import hashlib
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_digest_and_expiry(apps, schema_editor):
+    BlacklistedToken = apps.get_model('api', 'BlacklistedToken')
+    # The token was issued before it was blacklisted, so created_at plus the
+    # access token lifetime is a safe upper bound for its expiry.
+    lifetime = settings.SIMPLE_JWT["ACCESS_TOKEN_LIFETIME"]
+
+    batch = []
+    for row in BlacklistedToken.objects.only('id', 'token', 'created_at').iterator(chunk_size=1000):
+        row.token_digest = hashlib.sha256(row.token.encode()).hexdigest()
+        row.expires_at = row.created_at + lifetime
+        batch.append(row)
+        if len(batch) >= 1000:
+            BlacklistedToken.objects.bulk_update(batch, ['token_digest', 'expires_at'])
+            batch = []
+    if batch:
+        BlacklistedToken.objects.bulk_update(batch, ['token_digest', 'expires_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_blacklistedtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blacklistedtoken',
+            name='token_digest',
+            field=models.CharField(max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='blacklistedtoken',
+            name='expires_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.RunPython(populate_digest_and_expiry, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='blacklistedtoken',
+            name='token',
+        ),
+        migrations.AlterField(
+            model_name='blacklistedtoken',
+            name='token_digest',
+            field=models.CharField(max_length=64, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='blacklistedtoken',
+            name='expires_at',
+            field=models.DateTimeField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='blacklistedtoken',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+    ]
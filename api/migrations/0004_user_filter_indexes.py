@@ -0,0 +1,53 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:40
+
+from django.db import migrations, models
+
+SEARCH_COLUMNS = ('username', 'email', 'phone_number')
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # Trigram indexes serve the listing's case-insensitive substring and
+    # prefix search (UPPER(col) LIKE ...). They are PostgreSQL-only, and are
+    # built concurrently so the migration does not block writes.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS api_user_{column}_trgm_idx '
+            f'ON api_usermodel USING gin (UPPER({column}::text) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in SEARCH_COLUMNS:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS api_user_{column}_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('api', '0003_blacklistedtoken_digest'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='usermodel',
+            index=models.Index(fields=['role', 'id'], name='api_user_role_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usermodel',
+            index=models.Index(fields=['country', 'id'], name='api_user_country_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usermodel',
+            index=models.Index(fields=['city', 'id'], name='api_user_city_id_idx'),
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 10:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_user_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usermodel',
+            name='token_generation',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -1,3 +1,5 @@
+import hashlib
+
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.db import models
 from django.utils.timezone import now  # Import 'now' to set a default timestamp
@@ -31,6 +33,8 @@ class UserModel(AbstractBaseUser, PermissionsMixin):
     is_active = models.BooleanField(default=True)
     is_staff = models.BooleanField(default=False)
     updated_on = models.DateTimeField(auto_now=True)
+    # Embedded in every issued token; bumping it ends all of the user's sessions
+    token_generation = models.PositiveIntegerField(default=0)
 
     objects = CustomUserManager()
 
@@ -49,10 +53,24 @@ class UserModel(AbstractBaseUser, PermissionsMixin):
     )
 
 
+    class Meta:
+        # (column, id) so filtered listings can page by id straight off the index
+        indexes = [
+            models.Index(fields=["role", "id"], name="api_user_role_id_idx"),
+            models.Index(fields=["country", "id"], name="api_user_country_id_idx"),
+            models.Index(fields=["city", "id"], name="api_user_city_id_idx"),
+        ]
+
     def __str__(self):
         return self.username
     
 
 class BlacklistedToken(models.Model):
-    token = models.CharField(max_length=500, unique=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    """Revoked access token, stored as a SHA-256 digest of the raw JWT"""
+    token_digest = models.CharField(max_length=64, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    expires_at = models.DateTimeField(db_index=True)  # Row can be purged once the token has expired
+
+    @staticmethod
+    def digest(token):
+        return hashlib.sha256(token.encode()).hexdigest()
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination
+
+
+class UserCursorPagination(CursorPagination):
+    """Keyset pagination over users ordered by primary key.
+
+    Each page is fetched with ``WHERE id > <cursor> ORDER BY id LIMIT n`` so the
+    cost of a page does not grow with the size of the table.
+    """
+    ordering = "id"
+    page_size = settings.USER_LIST_PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = settings.USER_LIST_MAX_PAGE_SIZE
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that estimates the size of large unfiltered tables.
+
+    On PostgreSQL an unfiltered queryset takes its count from the planner's
+    ``pg_class.reltuples`` statistic once that exceeds
+    ``ADMIN_ESTIMATED_COUNT_THRESHOLD``, instead of running ``COUNT(*)``
+    over the whole table. Filtered querysets and small tables are counted
+    exactly. The estimate can be slightly off, so the last page number
+    shown may be approximate.
+    """
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == "postgresql" and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+                return int(row[0])
+        return super().count
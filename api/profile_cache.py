@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from .serializers import USER_FIELDS, user_to_dict, user_values
+
+User = get_user_model()
+
+
+def profile_cache_key(user_id):
+    return f"user-profile:{user_id}"
+
+
+def build_entry(user_id, data, updated_on):
+    """Cached profile payload plus validators derived from ``updated_on``"""
+    version = int(updated_on.timestamp() * 1_000_000)
+    return {
+        "data": data,
+        "etag": f'"{user_id}-{version}"',
+        "last_modified": int(updated_on.timestamp()),
+    }
+
+
+def _entry_from_user(user):
+    return build_entry(user.id, user_to_dict(user), user.updated_on)
+
+
+def _profile_queryset(user_id, fields):
+    return user_values(User.objects.filter(id=user_id), "updated_on", fields=fields)
+
+
+def get_profile_entry(user_id, user=None, fields=USER_FIELDS):
+    """Return the cached profile entry for ``user_id``, loading it on a miss.
+
+    ``user`` may be passed when the row is already in memory (the
+    authenticated user) to avoid a query on a miss. Returns ``None`` when
+    the user does not exist.
+
+    On a miss with a subset of ``fields`` only those columns are read, and
+    the partial entry is returned without being cached. Callers must pick
+    ``fields`` out of the entry, since a cache hit holds every field.
+    """
+    key = profile_cache_key(user_id)
+    entry = cache.get(key)
+    if entry is None:
+        if user is not None:
+            entry = _entry_from_user(user)
+        else:
+            row = _profile_queryset(user_id, fields).first()
+            if row is None:
+                return None
+            entry = build_entry(user_id, row, row.pop("updated_on"))
+            if fields != USER_FIELDS:
+                return entry
+        cache.set(key, entry, settings.PROFILE_CACHE_TIMEOUT)
+    return entry
+
+
+async def aget_profile_entry(user_id, user=None, fields=USER_FIELDS):
+    """Async variant of ``get_profile_entry``"""
+    key = profile_cache_key(user_id)
+    entry = await cache.aget(key)
+    if entry is None:
+        if user is not None:
+            entry = _entry_from_user(user)
+        else:
+            row = await _profile_queryset(user_id, fields).afirst()
+            if row is None:
+                return None
+            entry = build_entry(user_id, row, row.pop("updated_on"))
+            if fields != USER_FIELDS:
+                return entry
+        await cache.aset(key, entry, settings.PROFILE_CACHE_TIMEOUT)
+    return entry
+
+
+def get_profile_entries(user_ids):
+    """Return ``{user_id: entry}`` for the users that exist, in one cache and at most one DB round trip"""
+    keys = {profile_cache_key(user_id): user_id for user_id in user_ids}
+    entries = {keys[key]: entry for key, entry in cache.get_many(keys).items()}
+
+    missing = [user_id for user_id in user_ids if user_id not in entries]
+    if missing:
+        loaded = {}
+        for row in user_values(User.objects.filter(id__in=missing), "updated_on"):
+            loaded[row["id"]] = build_entry(row["id"], row, row.pop("updated_on"))
+        cache.set_many({profile_cache_key(user_id): entry for user_id, entry in loaded.items()},
+                       settings.PROFILE_CACHE_TIMEOUT)
+        entries.update(loaded)
+    return entries
+
+
+def invalidate_profile(user_id):
+    cache.delete(profile_cache_key(user_id))
+
+
+def not_modified(request, entry):
+    """304 response, with the validators it must repeat, when the client's If-None-Match/If-Modified-Since still match"""
+    response = get_conditional_response(request, etag=entry["etag"], last_modified=entry["last_modified"])
+    return response and add_validators(response, entry)
+
+
+def add_validators(response, entry):
+    response["ETag"] = entry["etag"]
+    response["Last-Modified"] = http_date(entry["last_modified"])
+    # Clients may keep the body but must revalidate before reusing it
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,119 @@
+import threading
+import time
+from datetime import timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.timezone import now
+
+from .models import BlacklistedToken
+from .routers import replica_configured, use_replica
+
+# Re-read rows this far behind the last high-water mark so that rows whose
+# transaction committed late, or that reached the replica late, are not
+# skipped by the incremental refresh.
+REFRESH_OVERLAP = timedelta(seconds=2)
+
+
+def refresh_overlap():
+    if replica_configured():
+        return max(REFRESH_OVERLAP, timedelta(seconds=settings.REPLICA_STICKY_SECONDS))
+    return REFRESH_OVERLAP
+
+
+class RevocationCache:
+    """Per-process set of revoked access token digests.
+
+    The set is loaded from the unexpired ``BlacklistedToken`` rows and then
+    refreshed incrementally from ``created_at`` at most once every
+    ``refresh_interval`` seconds, so a lookup normally costs no database
+    round trip. Refreshes read from the replica when one is configured;
+    with ``refresh_interval`` 0 every lookup checks the primary. Entries
+    are dropped once the token has expired.
+
+    Revocations made by this process are recorded with ``add`` and count
+    in every mode, including while their row is still queued by the
+    write-behind buffer. Other processes see a revocation once its row is
+    written and their next refresh has run.
+    """
+    def __init__(self, refresh_interval):
+        self.refresh_interval = refresh_interval
+        self._revoked = {}
+        self._high_water = None
+        self._next_refresh = 0.0
+        # _lock lets one thread refresh; _entries_lock guards every change to _revoked
+        self._lock = threading.Lock()
+        self._entries_lock = threading.Lock()
+
+    def is_revoked(self, token):
+        digest = BlacklistedToken.digest(token)
+        if self.refresh_interval <= 0:
+            return digest in self._revoked or BlacklistedToken.objects.filter(token_digest=digest).exists()
+
+        self._refresh_if_stale()
+        return digest in self._revoked
+
+    async def ais_revoked(self, token):
+        digest = BlacklistedToken.digest(token)
+        if self.refresh_interval <= 0:
+            return digest in self._revoked or await BlacklistedToken.objects.filter(token_digest=digest).aexists()
+
+        # Only hop to a thread when a refresh is actually due
+        if time.monotonic() >= self._next_refresh:
+            await sync_to_async(self._refresh_if_stale)()
+        return digest in self._revoked
+
+    def add(self, token_digest, expires_at):
+        """Record a revocation made by this process without waiting for a refresh"""
+        with self._entries_lock:
+            self._revoked[token_digest] = expires_at
+            if self.refresh_interval <= 0:
+                # Nothing else prunes the set in this mode
+                current = now()
+                self._revoked = {digest: expires for digest, expires in self._revoked.items() if expires > current}
+
+    def clear(self):
+        with self._lock, self._entries_lock:
+            self._revoked = {}
+            self._high_water = None
+            self._next_refresh = 0.0
+
+    def _refresh_if_stale(self):
+        if time.monotonic() < self._next_refresh:
+            return
+
+        # Only one thread refreshes; the others keep using the current set
+        if not self._lock.acquire(blocking=self._high_water is None):
+            return
+        try:
+            if time.monotonic() >= self._next_refresh:
+                with use_replica():
+                    self._refresh()
+                self._next_refresh = time.monotonic() + self.refresh_interval
+        finally:
+            self._lock.release()
+
+    def _refresh(self):
+        current = now()
+        if self._high_water is None:
+            rows = BlacklistedToken.objects.filter(expires_at__gt=current)
+        else:
+            rows = BlacklistedToken.objects.filter(created_at__gte=self._high_water - refresh_overlap())
+
+        loaded = {}
+        for digest, created_at, expires_at in rows.values_list("token_digest", "created_at", "expires_at"):
+            loaded[digest] = expires_at
+            if self._high_water is None or created_at > self._high_water:
+                self._high_water = created_at
+
+        if self._high_water is None:
+            self._high_water = current
+
+        # Swap in a pruned copy so readers never see a dict being mutated; the
+        # lock keeps entries added meanwhile from being lost in the swap
+        with self._entries_lock:
+            revoked = {**self._revoked, **loaded}
+            self._revoked = {digest: expires_at for digest, expires_at in revoked.items() if expires_at > current}
+
+
+revocation_cache = RevocationCache(refresh_interval=settings.TOKEN_REVOCATION_CACHE_REFRESH_SECONDS)
@@ -0,0 +1,89 @@
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .checks import cache_is_shared
+
+REPLICA_ALIAS = "replica"
+
+# Alias reads are sent to inside use_replica(); None means the primary
+_read_alias = ContextVar("read_alias", default=None)
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def recent_write_key(user_id):
+    return f"replica-pin:{user_id}"
+
+
+def note_write(user_id):
+    """Keep reads about ``user_id`` on the primary until the replica has caught up"""
+    if replica_configured():
+        cache.set(recent_write_key(user_id), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def _read_alias_for(pinned):
+    return REPLICA_ALIAS if replica_configured() and not pinned else None
+
+
+@contextmanager
+def use_replica(*user_ids):
+    """Send ORM reads in this block to the replica.
+
+    Reads stay on the primary when no replica is configured or when any of
+    ``user_ids`` was written within the last REPLICA_STICKY_SECONDS, so a
+    user sees their own registration or profile change straight away. The
+    pin lives in the shared default cache, so it holds in every worker. As
+    long as replication lag stays below REPLICA_STICKY_SECONDS, profile
+    cache misses filled inside the block cannot store a row the replica has
+    not caught up on yet. Rows written by bulk updates, which send no
+    signals, are not pinned.
+    """
+    pinned = bool(user_ids) and replica_configured() and bool(cache.get_many([recent_write_key(user_id) for user_id in user_ids]))
+    token = _read_alias.set(_read_alias_for(pinned))
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+@asynccontextmanager
+async def ause_replica(*user_ids):
+    """Async variant of ``use_replica``"""
+    pinned = bool(user_ids) and replica_configured() and bool(await cache.aget_many([recent_write_key(user_id) for user_id in user_ids]))
+    token = _read_alias.set(_read_alias_for(pinned))
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class PrimaryReplicaRouter:
+    """Writes always go to ``default``; reads go to the replica only inside ``use_replica()``"""
+    def __init__(self):
+        if replica_configured() and not cache_is_shared():
+            # Read-your-writes pins would only be seen by the worker that wrote
+            raise ImproperlyConfigured("A read replica requires a shared default cache; set REDIS_URL.")
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        # Inside a transaction on the primary, read what the transaction sees
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,53 @@
+import threading
+
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from drf_yasg import openapi
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+from rest_framework.response import Response
+
+API_INFO = openapi.Info(
+    title="Troviny API Documentation",
+    default_version='v1',
+    description="API documentation for Troviny project",
+    terms_of_service="https://www.example.com/terms/",
+    contact=openapi.Contact(email="bodyessam223@gmail.com"),
+    license=openapi.License(name="MIT License"),
+)
+
+
+class CachedSchemaView(get_schema_view(API_INFO, public=True, permission_classes=[permissions.AllowAny])):
+    """drf_yasg schema view that introspects the API once per process.
+
+    The schema is public, so it only depends on the API version and on the
+    scheme and host it is served from (used for the ``host`` and
+    ``schemes`` fields). Generated documents are kept for the lifetime of
+    the worker, which means a deploy is what invalidates them. Every
+    renderer, the Swagger and ReDoc pages included, is served from the
+    cached document.
+    """
+    _schemas = {}
+    _lock = threading.Lock()
+
+    def get(self, request, version="", format=None):
+        response = Response(self.get_schema(request, request.version or version or ""))
+        patch_cache_control(response, public=True, max_age=settings.SCHEMA_CACHE_MAX_AGE)
+        return response
+
+    @classmethod
+    def get_schema(cls, request, version=""):
+        key = (version, request.scheme, request.get_host())
+        schema = cls._schemas.get(key)
+        if schema is None:
+            # One thread generates; concurrent first hits wait for its result
+            with cls._lock:
+                schema = cls._schemas.get(key)
+                if schema is None:
+                    schema = cls.generator_class(API_INFO, version).get_schema(request, cls.public)
+                    cls._schemas[key] = schema
+        return schema
+
+    @classmethod
+    def clear(cls):
+        cls._schemas = {}
@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+User = get_user_model()
+
+# Claim carrying UserModel.token_generation at the time the token was issued
+GENERATION_CLAIM = "gen"
+
+
+def generation_cache_key(user_id):
+    return f"token-generation:{user_id}"
+
+
+def _generation_query(user_id):
+    return User.objects.filter(pk=user_id).values_list("token_generation", flat=True)
+
+
+def current_generation(user_id):
+    """The user's session generation, cached for TOKEN_GENERATION_CACHE_SECONDS"""
+    key = generation_cache_key(user_id)
+    generation = cache.get(key)
+    if generation is None:
+        generation = _generation_query(user_id).first() or 0
+        cache.set(key, generation, settings.TOKEN_GENERATION_CACHE_SECONDS)
+    return generation
+
+
+async def acurrent_generation(user_id):
+    """Async variant of ``current_generation``"""
+    key = generation_cache_key(user_id)
+    generation = await cache.aget(key)
+    if generation is None:
+        generation = await _generation_query(user_id).afirst() or 0
+        await cache.aset(key, generation, settings.TOKEN_GENERATION_CACHE_SECONDS)
+    return generation
+
+
+def _token_generation(token):
+    """``(user_id, generation)`` of a validated token; tokens issued before the claim existed are generation 0"""
+    return token.get(jwt_settings.USER_ID_CLAIM), token.get(GENERATION_CLAIM, 0)
+
+
+def is_stale(token):
+    """Whether the token was issued before its user's sessions were last ended"""
+    user_id, generation = _token_generation(token)
+    return user_id is not None and generation < current_generation(user_id)
+
+
+async def ais_stale(token):
+    """Async variant of ``is_stale``"""
+    user_id, generation = _token_generation(token)
+    return user_id is not None and generation < await acurrent_generation(user_id)
+
+
+def end_all_sessions(user_id):
+    """Invalidate every access and refresh token of the user with a single row update"""
+    User.objects.filter(pk=user_id).update(token_generation=F("token_generation") + 1)
+    generation = _generation_query(user_id).first()
+    cache.set(generation_cache_key(user_id), generation, settings.TOKEN_GENERATION_CACHE_SECONDS)
+    return generation
@@ -0,0 +1,19 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .profile_cache import invalidate_profile
+from .routers import note_write
+
+User = get_user_model()
+
+
+@receiver([post_save, post_delete], sender=User)
+def drop_cached_profile(sender, instance, **kwargs):
+    """Keep the profile cache in step with saves and deletes of the user row.
+
+    The entry is dropped from the default cache, so other workers only see
+    the change when that cache is shared (REDIS_URL, see api.W001).
+    """
+    invalidate_profile(instance.pk)
+    note_write(instance.pk)
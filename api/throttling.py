@@ -0,0 +1,84 @@
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    """Rate limit with an atomic sliding-window counter in Django's cache.
+
+    DRF's SimpleRateThrottle stores a list of timestamps and writes it back,
+    which loses updates when several gunicorn workers share one cache. Here
+    each fixed window is a counter bumped with ``cache.add`` + ``cache.incr``
+    (atomic on Redis and Memcached), and the previous window is weighted by
+    how much of it still overlaps the sliding window. Rates come from
+    ``REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"][scope]``.
+
+    The limit is only global when the cache is shared. With the per-process
+    memory cache each worker counts on its own, so settings refuse to start
+    more than one worker (WEB_CONCURRENCY) without REDIS_URL.
+    """
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        current_key, previous_key = self.window_keys()
+        self.cache.add(current_key, 0, self.duration * 2)
+        try:
+            current = self.cache.incr(current_key)
+        except ValueError:
+            # The key expired between add() and incr()
+            self.cache.set(current_key, 1, self.duration * 2)
+            current = 1
+        previous = self.cache.get(previous_key, 0)
+        return self.evaluate(current, previous)
+
+    async def aallow(self, ident):
+        """Async check for non-DRF views; ``ident`` is the value the cache key is built from"""
+        if self.rate is None or ident is None:
+            return True
+
+        self.key = self.cache_format % {"scope": self.scope, "ident": ident}
+        self.now = self.timer()
+        current_key, previous_key = self.window_keys()
+        await self.cache.aadd(current_key, 0, self.duration * 2)
+        try:
+            current = await self.cache.aincr(current_key)
+        except ValueError:
+            await self.cache.aset(current_key, 1, self.duration * 2)
+            current = 1
+        previous = await self.cache.aget(previous_key, 0)
+        return self.evaluate(current, previous)
+
+    def window_keys(self):
+        window = int(self.now // self.duration)
+        return f"{self.key}:{window}", f"{self.key}:{window - 1}"
+
+    def evaluate(self, current, previous):
+        elapsed = (self.now % self.duration) / self.duration
+        return previous * (1 - elapsed) + current <= self.num_requests
+
+    def wait(self):
+        # The estimate can only drop once the current window rolls over
+        return self.duration - (self.now % self.duration)
+
+
+class LoginIPRateThrottle(SlidingWindowRateThrottle):
+    """Login attempts per client IP"""
+    scope = "login_ip"
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {"scope": self.scope, "ident": self.get_ident(request)}
+
+
+class LoginUsernameRateThrottle(SlidingWindowRateThrottle):
+    """Login attempts per target username, whichever IPs they come from"""
+    scope = "login_username"
+
+    def get_cache_key(self, request, view):
+        username = request.data.get("username")
+        if not isinstance(username, str) or not username:
+            return None
+        return self.cache_format % {"scope": self.scope, "ident": username.lower()}
@@ -0,0 +1,200 @@
+import atexit
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.utils.timezone import now
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken as RefreshBlacklistEntry
+from rest_framework_simplejwt.token_blacklist.models import OutstandingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .models import BlacklistedToken
+from .revocation import revocation_cache
+
+logger = logging.getLogger(__name__)
+
+User = get_user_model()
+
+
+def pending_blacklist_key(jti):
+    return f"refresh-blacklisted:{jti}"
+
+
+class TokenWriteBuffer:
+    """Write-behind buffer for token bookkeeping rows.
+
+    When enabled, the ``OutstandingToken`` row written for every issued
+    refresh token, and the refresh and access blacklist rows written on
+    logout, are queued in memory. A background thread flushes them every
+    ``interval`` seconds (sooner once ``max_batch`` rows are waiting) with
+    multi-row inserts in a single transaction. Pending rows are flushed
+    synchronously when the process exits.
+
+    Revocations are never lost to the delay:
+
+    - a blacklisted refresh token counts as revoked while its row is
+      pending, in this process and through a marker in the default cache
+      that lasts until the token expires. Other workers see the marker only
+      when that cache is shared (REDIS_URL). With the per-process memory
+      cache they accept the token until the row is flushed (api.W002);
+    - a revoked access token is added to this process's revocation cache
+      at once, whatever TOKEN_REVOCATION_CACHE_REFRESH_SECONDS is. Other
+      workers see it on their first refresh after the flush, so up to
+      ``interval`` seconds later than without write-behind;
+    - a failed flush puts the rows back, so they stay revoked and are retried.
+
+    ``BufferedRefreshToken`` only routes writes here when enabled;
+    ``revoke_access`` writes straight to the database when disabled.
+    """
+    def __init__(self, enabled, interval, max_batch):
+        self.enabled = enabled
+        self.interval = interval
+        self.max_batch = max_batch
+        self._outstanding = {}
+        self._blacklisted = {}
+        self._revoked = {}
+        self._flushing_blacklisted = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._worker_pid = None
+
+    def outstand(self, token, user_id):
+        """Queue the ``OutstandingToken`` row for a newly issued refresh token"""
+        entry = self._outstanding_row(token, user_id)
+        with self._lock:
+            self._outstanding[entry.jti] = entry
+        self._queued()
+
+    def blacklist(self, token):
+        """Queue the blacklisting of a refresh token (the caller has already validated it)"""
+        entry = self._outstanding_row(token, token.payload.get(jwt_settings.USER_ID_CLAIM))
+        remaining = (entry.expires_at - now()).total_seconds()
+        cache.set(pending_blacklist_key(entry.jti), True, max(int(remaining), 1))
+        with self._lock:
+            self._blacklisted[entry.jti] = entry
+        self._queued()
+
+    def revoke_access(self, token_digest, expires_at):
+        """Blacklist an access token by digest; takes effect in this process immediately"""
+        revocation_cache.add(token_digest, expires_at)
+        if not self.enabled:
+            BlacklistedToken.objects.create(token_digest=token_digest, expires_at=expires_at)
+            return
+        with self._lock:
+            self._revoked[token_digest] = expires_at
+        self._queued()
+
+    async def arevoke_access(self, token_digest, expires_at):
+        """Async variant of ``revoke_access``"""
+        revocation_cache.add(token_digest, expires_at)
+        if not self.enabled:
+            await BlacklistedToken.objects.acreate(token_digest=token_digest, expires_at=expires_at)
+            return
+        with self._lock:
+            self._revoked[token_digest] = expires_at
+        self._queued()
+
+    def is_blacklist_pending(self, jti):
+        """Whether a refresh token was blacklisted but its row may not be written yet"""
+        if jti in self._blacklisted or jti in self._flushing_blacklisted:
+            return True
+        return self.enabled and bool(cache.get(pending_blacklist_key(jti)))
+
+    def pending(self):
+        return len(self._outstanding) + len(self._blacklisted) + len(self._revoked)
+
+    def flush(self):
+        """Write every queued row now; returns the number of rows written"""
+        with self._flush_lock:
+            with self._lock:
+                outstanding, self._outstanding = self._outstanding, {}
+                blacklisted, self._blacklisted = self._blacklisted, {}
+                revoked, self._revoked = self._revoked, {}
+                self._flushing_blacklisted = blacklisted
+            if not (outstanding or blacklisted or revoked):
+                return 0
+
+            try:
+                self._write(outstanding, blacklisted, revoked)
+            except Exception:
+                logger.exception("Token bookkeeping flush failed; %d rows will be retried",
+                                 len(outstanding) + len(blacklisted) + len(revoked))
+                with self._lock:
+                    self._outstanding = {**outstanding, **self._outstanding}
+                    self._blacklisted = {**blacklisted, **self._blacklisted}
+                    self._revoked = {**revoked, **self._revoked}
+                return 0
+            finally:
+                self._flushing_blacklisted = {}
+
+        cache.delete_many([pending_blacklist_key(jti) for jti in blacklisted])
+        return len(outstanding) + len(blacklisted) + len(revoked)
+
+    def _write(self, outstanding, blacklisted, revoked):
+        # A blacklisted token may have been issued by a process that wrote
+        # its row long ago, or by this one and still be queued
+        rows = [*outstanding.values(), *blacklisted.values()]
+        # Like simplejwt, keep tokens of since-deleted users without a user
+        existing = set(User.objects.filter(pk__in={row.user_id for row in rows}).values_list("pk", flat=True))
+        for row in rows:
+            if row.user_id is not None and int(row.user_id) not in existing:
+                row.user_id = None
+
+        with transaction.atomic():
+            OutstandingToken.objects.bulk_create(rows, batch_size=self.max_batch, ignore_conflicts=True)
+            if blacklisted:
+                token_ids = OutstandingToken.objects.filter(jti__in=list(blacklisted)).values_list("id", flat=True)
+                RefreshBlacklistEntry.objects.bulk_create(
+                    [RefreshBlacklistEntry(token_id=token_id) for token_id in token_ids],
+                    batch_size=self.max_batch, ignore_conflicts=True,
+                )
+            BlacklistedToken.objects.bulk_create(
+                [BlacklistedToken(token_digest=digest, expires_at=expires_at) for digest, expires_at in revoked.items()],
+                batch_size=self.max_batch, ignore_conflicts=True,
+            )
+
+    @staticmethod
+    def _outstanding_row(token, user_id):
+        return OutstandingToken(
+            user_id=user_id,
+            jti=token[jwt_settings.JTI_CLAIM],
+            token=str(token),
+            created_at=token.current_time,
+            expires_at=datetime_from_epoch(token["exp"]),
+        )
+
+    def _queued(self):
+        # The flush thread is started lazily so a preloaded master forks workers without one
+        if self._worker_pid != os.getpid():
+            self._start_worker()
+        if self.pending() >= self.max_batch:
+            self._wake.set()
+
+    def _start_worker(self):
+        with self._lock:
+            if self._worker_pid == os.getpid():
+                return
+            self._worker_pid = os.getpid()
+        threading.Thread(target=self._run, name="token-write-behind", daemon=True).start()
+        atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+            # Hand the connection back (to the pool, if one is configured) between flushes
+            connections.close_all()
+
+
+token_writer = TokenWriteBuffer(
+    enabled=settings.TOKEN_WRITE_BEHIND,
+    interval=settings.TOKEN_WRITE_BEHIND_INTERVAL,
+    max_batch=settings.TOKEN_WRITE_BEHIND_MAX_BATCH,
+)
@@ -0,0 +1,81 @@
+from django.contrib.auth import get_user_model
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import BlacklistMixin, RefreshToken
+
+from .authentication import set_identity_claims
+from .sessions import is_stale
+from .token_writer import token_writer
+
+User = get_user_model()
+
+
+class BufferedRefreshToken(RefreshToken):
+    """RefreshToken whose bookkeeping rows go through ``token_writer``.
+
+    With TOKEN_WRITE_BEHIND off it behaves exactly like simplejwt's
+    RefreshToken. With it on, issuing, rotating and blacklisting a token
+    queue their rows instead of writing them, and a token whose
+    blacklisting is still queued is rejected. Either way, tokens issued
+    before the user's sessions were last ended are rejected.
+    """
+    @classmethod
+    def for_user(cls, user):
+        if not token_writer.enabled:
+            return super().for_user(user)
+        # Token.for_user builds the token without BlacklistMixin's synchronous insert
+        token = super(BlacklistMixin, cls).for_user(user)
+        token_writer.outstand(token, user.pk)
+        return token
+
+    def outstand(self):
+        if not token_writer.enabled:
+            return super().outstand()
+        token_writer.outstand(self, self.payload.get(jwt_settings.USER_ID_CLAIM))
+
+    def blacklist(self):
+        if not token_writer.enabled:
+            return super().blacklist()
+        token_writer.blacklist(self)
+
+    def check_blacklist(self):
+        if token_writer.is_blacklist_pending(self.payload[jwt_settings.JTI_CLAIM]):
+            raise TokenError("Token is blacklisted")
+        super().check_blacklist()
+
+    def verify(self):
+        super().verify()
+        if is_stale(self.payload):
+            raise TokenError("Session ended")
+
+
+class BufferedTokenRefreshSerializer(TokenRefreshSerializer):
+    """TokenRefreshView serializer that rotates through ``BufferedRefreshToken``.
+
+    simplejwt copies every claim of the refresh token into the new tokens.
+    The identity claims are set again from the user row first, so a role
+    or staff change reaches the next access token without a new login.
+    """
+    token_class = BufferedRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+
+        user_id = refresh.payload.get(jwt_settings.USER_ID_CLAIM)
+        user = User.objects.filter(**{jwt_settings.USER_ID_FIELD: user_id}).first() if user_id else None
+        if user is None or not jwt_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+        set_identity_claims(refresh, user)
+
+        data = {"access": str(refresh.access_token)}
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            if jwt_settings.BLACKLIST_AFTER_ROTATION:
+                refresh.blacklist()
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            refresh.outstand()
+            data["refresh"] = str(refresh)
+        return data
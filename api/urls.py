@@ -1,42 +1,49 @@
+from functools import cache
+
+from django.conf import settings
 from django.urls import path, include
 from rest_framework_simplejwt.views import TokenRefreshView
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-from rest_framework import permissions
 from . import views  # Import views from the same app
 
-# Swagger API Documentation
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Troviny API Documentation",
-        default_version='v1',
-        description="API documentation for Troviny project",
-        terms_of_service="https://www.example.com/terms/",
-        contact=openapi.Contact(email="bodyessam223@gmail.com"),
-        license=openapi.License(name="MIT License"),
-    ),
-    public=True,
-    permission_classes=[permissions.AllowAny],
-)
+# Under ASGI the auth and profile endpoints can be served by native async views
+if settings.ASYNC_API_VIEWS:
+    from . import async_views as endpoint_views
+else:
+    endpoint_views = views
+
+
+def lazy_schema_view(factory, *args):
+    """Defer importing drf_yasg's schema machinery until the docs are first requested"""
+    @cache
+    def load():
+        from .schema import CachedSchemaView
+        return getattr(CachedSchemaView, factory)(*args)
+
+    def view(request, *view_args, **view_kwargs):
+        return load()(request, *view_args, **view_kwargs)
+
+    view.csrf_exempt = True
+    return view
+
 
 auth_urls = [
-    path('register/', views.register, name='register'),
-    path('login/', views.login, name='login'),
-    path('logout/', views.logout, name='logout'),
+    path('register/', endpoint_views.register, name='register'),
+    path('login/', endpoint_views.login, name='login'),
+    path('logout/', endpoint_views.logout, name='logout'),
+    path('logout_all/', views.logout_all, name='logout-all'),
     path('refreshToken/', TokenRefreshView.as_view(), name='token-refresh'),
 ]
 
 user_urls = [
-    path('', views.get_current_user_profile, name='get-user'),  # ✅ Removed 'user/'
-    path('single_profile/<int:user_id>/', views.get_single_user_profile, name='specific-user-profile'),
+    path('', endpoint_views.get_current_user_profile, name='get-user'),  # ✅ Removed 'user/'
+    path('single_profile/<int:user_id>/', endpoint_views.get_single_user_profile, name='specific-user-profile'),
+    path('profiles/', views.get_user_profiles, name='user-profiles'),
     path('all_users/', views.get_all_users, name='get-all-users'),  # ✅ Added trailing slash
+    path('export/', views.export_users, name='export-users'),
+    path('import/', views.import_users, name='import-users'),
 ]
 
 urlpatterns = [
-    # Swagger UI
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('swagger.json/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-
     # Authentication URLs
     path('auth/', include((auth_urls, 'auth'))),  
 
@@ -44,3 +51,9 @@ urlpatterns = [
     path('user/', include((user_urls, 'user'))),  
 ]
 
+if settings.API_DOCS_ENABLED:
+    # Swagger UI; the schema is generated once per process (see api.schema)
+    urlpatterns += [
+        path('swagger/', lazy_schema_view('with_ui', 'swagger'), name='schema-swagger-ui'),
+        path('swagger.json/', lazy_schema_view('without_ui'), name='schema-json'),
+    ]
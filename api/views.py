@@ -1,20 +1,65 @@
-from django.contrib.auth import get_user_model, authenticate
-from django.contrib.auth.hashers import make_password
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+import io
+import secrets
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.http import require_GET
+from rest_framework.decorators import api_view, authentication_classes, parser_classes, permission_classes, throttle_classes
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from drf_yasg.utils import swagger_auto_schema
 from drf_yasg import openapi
+from .authentication import StatelessJWTAuthentication, set_identity_claims
+from .exports import EXPORT_FORMATS, iter_export_lines
+from .filters import SEARCH_MODES, filter_users
+from .hashing import HashingOverloaded, authenticate_user, hash_password
+from .images import CONTENT_TYPES, IMAGE_NAME, decode_picture, ensure_thumbnail, image_path, image_url, store_image
+from .imports import IMPORT_FORMATS, UserImporter, check_encoding, parse_rows
+from .metrics import render_metrics
 from .models import BlacklistedToken
+from .pagination import UserCursorPagination
+from .profile_cache import add_validators, get_profile_entries, get_profile_entry, not_modified
+from .routers import use_replica
+from .serializers import parse_fields, pick_fields, user_values
+from .sessions import GENERATION_CLAIM, end_all_sessions
+from .throttling import LoginIPRateThrottle, LoginUsernameRateThrottle
+from .token_writer import token_writer
+from .tokens import BufferedRefreshToken
 from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
 
 # Get the User model
 User = get_user_model()
 
+def hashing_overloaded_response():
+    return Response(
+        {"error": "Too many authentication requests, please retry shortly."},
+        status=503,
+        headers={"Retry-After": "1"},
+    )
+
+BODY_NOT_AN_OBJECT = "The request body must be a JSON object."
+REGISTER_REQUIRED_FIELDS = ("username", "email", "password")
+
+
+def missing_fields(data, fields):
+    """Required fields of ``data`` that are absent, empty or not strings"""
+    return [field for field in fields if not data.get(field) or not isinstance(data[field], str)]
+
+
+def missing_fields_message(missing):
+    return f"Missing or invalid fields: {', '.join(missing)}"
+
 # Generate JWT Token
 def get_tokens_for_user(user):
-    refresh = RefreshToken.for_user(user)
+    refresh = BufferedRefreshToken.for_user(user)
+    # Identity claims let StatelessJWTAuthentication skip loading the user row
+    set_identity_claims(refresh, user)
+    # Lets "log out everywhere" invalidate the pair without a row per token
+    refresh[GENERATION_CLAIM] = user.token_generation
     return {
         "access": str(refresh.access_token),
         "refresh": str(refresh),
@@ -30,19 +75,28 @@ def get_tokens_for_user(user):
             "password": openapi.Schema(type=openapi.TYPE_STRING, description="Password", format="password"),
             "phone_number": openapi.Schema(type=openapi.TYPE_STRING, description="Phone Number"),
             "address": openapi.Schema(type=openapi.TYPE_STRING, description="Address"),
-            "profile_picture": openapi.Schema(type=openapi.TYPE_STRING, description="Profile Picture URL"),
+            "profile_picture": openapi.Schema(
+                type=openapi.TYPE_STRING, description="Profile picture: an http(s) URL or a base64 image data URL",
+            ),
             "country": openapi.Schema(type=openapi.TYPE_STRING, description="Country"),
             "city": openapi.Schema(type=openapi.TYPE_STRING, description="City"),
             "role": openapi.Schema(type=openapi.TYPE_STRING, description="User Role"),
         },
         required=["username", "email", "password"],
     ),
-    responses={201: "User registered successfully", 400: "Username or Email already taken"},
+    responses={201: "User registered successfully", 400: "Missing fields, or username or email already taken", 503: "Too many authentication requests"},
     tags=["Auth"],
 )
 @api_view(["POST"])
 def register(request):
     """User Registration"""
+    if not isinstance(request.data, dict):
+        return Response({"error": BODY_NOT_AN_OBJECT}, status=400)
+
+    missing = missing_fields(request.data, REGISTER_REQUIRED_FIELDS)
+    if missing:
+        return Response({"error": missing_fields_message(missing)}, status=400)
+
     username = request.data.get("username")
     email = request.data.get("email")
     password = request.data.get("password")
@@ -59,6 +113,23 @@ def register(request):
     if User.objects.filter(email=email).exists():
         return Response({"error": "A user with this email already exists."}, status=400)
 
+    try:
+        picture_data = decode_picture(profile_picture)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    try:
+        hashed_password = hash_password(password)  # Hash password off the request thread
+    except HashingOverloaded:
+        return hashing_overloaded_response()
+
+    if picture_data is not None:
+        # Stored only once the hash is done, so a shed request leaves no file behind
+        try:
+            profile_picture = image_url(store_image(picture_data))  # Keep only a short image URL in the row
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=400)
+
     user = User.objects.create(
         username=username,
         email=email,
@@ -68,7 +139,7 @@ def register(request):
         country=country,
         city=city,
         role=role,
-        password=make_password(password),  # Hash password before saving
+        password=hashed_password,
     )
 
     tokens = get_tokens_for_user(user)
@@ -84,16 +155,28 @@ def register(request):
         },
         required=["username", "password"],
     ),
-    responses={200: "Login Successful", 400: "Invalid Credentials"},
+    responses={
+        200: "Login Successful",
+        400: "Invalid Credentials",
+        429: "Too many login attempts",
+        503: "Too many authentication requests",
+    },
     tags=["Auth"],
 )
 @api_view(["POST"])
+@throttle_classes([LoginIPRateThrottle, LoginUsernameRateThrottle])
 def login(request):
     """User Login"""
+    if not isinstance(request.data, dict):
+        return Response({"error": BODY_NOT_AN_OBJECT}, status=400)
+
     username = request.data.get("username")
     password = request.data.get("password")
 
-    user = authenticate(username=username, password=password)
+    try:
+        user = authenticate_user(username, password)
+    except HashingOverloaded:
+        return hashing_overloaded_response()
 
     if user is None:
         return Response({"error": "Invalid username or password."}, status=400)
@@ -120,6 +203,9 @@ def login(request):
 @permission_classes([IsAuthenticated])
 def logout(request):
     """User Logout"""
+    if not isinstance(request.data, dict):
+        return Response({"error": BODY_NOT_AN_OBJECT}, status=400)
+
     refresh_token = request.data.get("refresh_token")
     access_token = request.headers.get("Authorization", "").split(" ")[1]  # Extract access token
 
@@ -128,39 +214,57 @@ def logout(request):
 
     try:
         # Blacklist the refresh token
-        token = RefreshToken(refresh_token)
+        token = BufferedRefreshToken(refresh_token)
         token.blacklist()
 
         # Blacklist the access token
-        BlacklistedToken.objects.create(token=access_token)
+        token_writer.revoke_access(BlacklistedToken.digest(access_token), datetime_from_epoch(request.auth["exp"]))
 
         return Response({"message": "Logged out successfully"}, status=200)
     except Exception:
         return Response({"error": "Invalid or expired refresh token"}, status=400)
 
+@swagger_auto_schema(
+    method="post",
+    responses={200: "Every session of the user ended"},
+    tags=["Auth"],
+)
+@api_view(["POST"])
+@permission_classes([IsAuthenticated])
+def logout_all(request):
+    """Log out everywhere: invalidate every access and refresh token of the user"""
+    end_all_sessions(request.user.id)
+    return Response({"message": "Logged out of all sessions"}, status=200)
+
+FIELDS_PARAMETER = openapi.Parameter(
+    "fields",
+    openapi.IN_QUERY,
+    description="Comma-separated user fields to return (all fields when omitted)",
+    type=openapi.TYPE_STRING,
+)
+
 @swagger_auto_schema(
     method="get",
-    responses={200: "User profile"},
+    manual_parameters=[FIELDS_PARAMETER],
+    responses={200: "User profile", 304: "Profile unchanged since the given ETag", 400: "Unknown field"},
     tags=["User"],
 )
 @api_view(["GET"])
+@authentication_classes([StatelessJWTAuthentication])
 @permission_classes([IsAuthenticated])
 def get_current_user_profile(request):
     """Get the authenticated user's profile"""
-    user = request.user
-    return Response({
-        "id": user.id,
-        "username": user.username,
-        "email": user.email,
-        "phone_number": user.phone_number,
-        "address": user.address,
-        "profile_picture": user.profile_picture,
-        "country": user.country,
-        "city": user.city,
-        "role": user.role,
-        "is_active": user.is_active,
-        "is_staff": user.is_staff,
-    }, status=200)
+    try:
+        fields = parse_fields(request.query_params.get("fields"))
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    with use_replica(request.user.id):
+        entry = get_profile_entry(request.user.id, fields=fields)
+    if entry is None:
+        return Response({"error": "User not found"}, status=404)
+
+    return not_modified(request, entry) or add_validators(Response(pick_fields(entry["data"], fields), status=200), entry)
 
 @swagger_auto_schema(
     method="get",
@@ -170,45 +274,227 @@ def get_current_user_profile(request):
             openapi.IN_PATH,
             description="ID of the user to retrieve",
             type=openapi.TYPE_INTEGER,
-        )
+        ),
+        FIELDS_PARAMETER,
     ],
-    responses={200: "User profile", 404: "User not found"},
+    responses={
+        200: "User profile", 304: "Profile unchanged since the given ETag", 400: "Unknown field", 404: "User not found",
+    },
     tags=["User"],
 )
 @api_view(["GET"])
+@authentication_classes([StatelessJWTAuthentication])
 @permission_classes([IsAuthenticated])
 def get_single_user_profile(request, user_id=None):
     """Retrieve a single user profile"""
     try:
-        user = User.objects.get(id=user_id) if user_id else request.user
-    except User.DoesNotExist:
+        fields = parse_fields(request.query_params.get("fields"))
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    user_id = user_id or request.user.id
+    with use_replica(user_id, request.user.id):
+        entry = get_profile_entry(user_id, fields=fields)
+
+    if entry is None:
         return Response({"error": "User not found"}, status=404)
 
+    return not_modified(request, entry) or add_validators(Response(pick_fields(entry["data"], fields), status=200), entry)
+
+@swagger_auto_schema(
+    method="get",
+    manual_parameters=[
+        openapi.Parameter(
+            "ids",
+            openapi.IN_QUERY,
+            description="Comma-separated user ids",
+            type=openapi.TYPE_STRING,
+            required=True,
+        )
+    ],
+    responses={200: "Profiles keyed by user id", 400: "Missing, invalid or too many ids"},
+    tags=["User"],
+)
+@api_view(["GET"])
+@authentication_classes([StatelessJWTAuthentication])
+@permission_classes([IsAuthenticated])
+def get_user_profiles(request):
+    """Retrieve several user profiles in one request"""
+    try:
+        user_ids = list(dict.fromkeys(int(user_id) for user_id in request.query_params.get("ids", "").split(",") if user_id))
+    except ValueError:
+        return Response({"error": "ids must be a comma-separated list of integers"}, status=400)
+
+    if not user_ids:
+        return Response({"error": "At least one id is required"}, status=400)
+
+    if len(user_ids) > settings.USER_BATCH_MAX_IDS:
+        return Response({"error": f"At most {settings.USER_BATCH_MAX_IDS} ids can be requested at once"}, status=400)
+
+    with use_replica(request.user.id, *user_ids):
+        entries = get_profile_entries(user_ids)
     return Response({
-        "id": user.id,
-        "username": user.username,
-        "email": user.email,
-        "phone_number": user.phone_number,
-        "address": user.address,
-        "profile_picture": user.profile_picture,
-        "country": user.country,
-        "city": user.city,
-        "role": user.role,
-        "is_active": user.is_active,
-        "is_staff": user.is_staff,
+        str(user_id): entries[user_id]["data"] if user_id in entries else {"error": "User not found"}
+        for user_id in user_ids
     }, status=200)
 
 @swagger_auto_schema(
     method="get",
-    responses={200: "List of users"},
+    manual_parameters=[
+        openapi.Parameter("role", openapi.IN_QUERY, description="Exact role", type=openapi.TYPE_STRING),
+        openapi.Parameter("country", openapi.IN_QUERY, description="Exact country", type=openapi.TYPE_STRING),
+        openapi.Parameter("city", openapi.IN_QUERY, description="Exact city", type=openapi.TYPE_STRING),
+        openapi.Parameter("is_active", openapi.IN_QUERY, description="Filter on active status", type=openapi.TYPE_BOOLEAN),
+        openapi.Parameter("is_staff", openapi.IN_QUERY, description="Filter on staff status", type=openapi.TYPE_BOOLEAN),
+        openapi.Parameter(
+            "search",
+            openapi.IN_QUERY,
+            description="Case-insensitive search over username, email and phone number",
+            type=openapi.TYPE_STRING,
+        ),
+        openapi.Parameter(
+            "search_mode",
+            openapi.IN_QUERY,
+            description="Match the search term anywhere (contains) or at the start (prefix)",
+            type=openapi.TYPE_STRING,
+            enum=list(SEARCH_MODES),
+            default="contains",
+        ),
+        openapi.Parameter(
+            "cursor",
+            openapi.IN_QUERY,
+            description="Opaque cursor taken from the `next` link of a previous page",
+            type=openapi.TYPE_STRING,
+        ),
+        openapi.Parameter(
+            "page_size",
+            openapi.IN_QUERY,
+            description="Number of users per page (capped by the server)",
+            type=openapi.TYPE_INTEGER,
+        ),
+        FIELDS_PARAMETER,
+    ],
+    responses={200: "Page of users", 400: "Invalid filter or unknown field"},
     tags=["User"],
 )
 @api_view(["GET"])
+@authentication_classes([StatelessJWTAuthentication])
 @permission_classes([IsAuthenticated])
 def get_all_users(request):
-    """Retrieve all users"""
-    users = User.objects.all().values(
-        "id", "username", "email", "phone_number", "address",
-        "profile_picture", "country", "city", "role", "is_active", "is_staff"
-    )
-    return Response(list(users), status=200)
+    """Retrieve users one page at a time, optionally filtered and searched"""
+    try:
+        fields = parse_fields(request.query_params.get("fields"))
+        # The cursor is built from the id of the last row, so it is always read
+        selected = fields if "id" in fields else ("id", *fields)
+        users = filter_users(user_values(User.objects.all(), fields=selected), request.query_params)
+    except ValueError as exc:
+        return Response({"error": str(exc)}, status=400)
+
+    paginator = UserCursorPagination()
+    with use_replica(request.user.id):
+        page = paginator.paginate_queryset(users, request)
+    if "id" not in fields:
+        page = [pick_fields(row, fields) for row in page]
+    return paginator.get_paginated_response(page)
+
+@swagger_auto_schema(
+    method="get",
+    manual_parameters=[
+        openapi.Parameter(
+            "export_format",
+            openapi.IN_QUERY,
+            description="Export format",
+            type=openapi.TYPE_STRING,
+            enum=list(EXPORT_FORMATS),
+            default="ndjson",
+        ),
+    ],
+    responses={200: "Stream of every user", 400: "Unsupported format"},
+    tags=["User"],
+)
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def export_users(request):
+    """Stream every user as NDJSON or CSV"""
+    fmt = request.query_params.get("export_format", "ndjson")
+    if fmt not in EXPORT_FORMATS:
+        return Response({"error": f"Format must be one of: {', '.join(EXPORT_FORMATS)}"}, status=400)
+
+    content_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+    response = StreamingHttpResponse(iter_export_lines(fmt), content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="users.{fmt}"'
+    return response
+
+@swagger_auto_schema(
+    method="post",
+    manual_parameters=[
+        openapi.Parameter(
+            "file",
+            openapi.IN_FORM,
+            description="CSV (with a header row) or NDJSON file of users",
+            type=openapi.TYPE_FILE,
+            required=True,
+        ),
+        openapi.Parameter(
+            "import_format",
+            openapi.IN_QUERY,
+            description="File format; inferred from the file extension when omitted",
+            type=openapi.TYPE_STRING,
+            enum=list(IMPORT_FORMATS),
+        ),
+    ],
+    responses={200: "Import report with per-row errors", 400: "Missing file or unsupported format"},
+    tags=["User"],
+)
+@api_view(["POST"])
+@parser_classes([MultiPartParser])
+@permission_classes([IsAdminUser])
+def import_users(request):
+    """Bulk register users from a CSV or NDJSON upload"""
+    upload = request.FILES.get("file")
+    if upload is None:
+        return Response({"error": "A file upload is required"}, status=400)
+
+    fmt = request.query_params.get("import_format") or ("csv" if upload.name.endswith(".csv") else "ndjson")
+    if fmt not in IMPORT_FORMATS:
+        return Response({"error": f"Format must be one of: {', '.join(IMPORT_FORMATS)}"}, status=400)
+
+    try:
+        check_encoding(upload.file)
+    except UnicodeDecodeError:
+        return Response({"error": "The file must be UTF-8 encoded"}, status=400)
+
+    stream = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+    report = UserImporter().run(parse_rows(stream, fmt))
+    return Response(report, status=200)
+
+@require_GET
+def metrics(request):
+    """Prometheus scrape endpoint for this worker's request metrics"""
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        if not secrets.compare_digest(request.headers.get("Authorization", ""), expected):
+            return HttpResponse(status=403)
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@require_GET
+def profile_image(request, name):
+    """Serve a stored profile picture, or with ``?size=`` one of its thumbnails"""
+    if not IMAGE_NAME.match(name) or not image_path(name).is_file():
+        raise Http404("Image not found")
+
+    size = request.GET.get("size")
+    if size is not None:
+        if not size.isdigit() or int(size) not in settings.PROFILE_IMAGE_THUMBNAIL_SIZES:
+            raise Http404("Unsupported thumbnail size")
+        # Without Pillow the original is served instead
+        name = ensure_thumbnail(name, int(size)) or name
+
+    # Content-addressed, so a name always refers to the same bytes
+    etag = f'"{name}"'
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = FileResponse(image_path(name).open("rb"), content_type=CONTENT_TYPES[name.rsplit(".", 1)[1]])
+    response["ETag"] = etag
+    patch_cache_control(response, public=True, max_age=365 * 24 * 3600, immutable=True)
+    return response
@@ -0,0 +1,13 @@
+# Read by gunicorn from the working directory; command-line flags still win.
+import os
+
+# Import the application once in the master and fork workers from it. With
+# WARM_UP_ON_LOAD=1 the URL resolver and API schema are built there too.
+preload_app = os.getenv("GUNICORN_PRELOAD", "0") == "1"
+
+# Worker processes come from WEB_CONCURRENCY, which gunicorn reads itself.
+# Settings read both variables to size the per-process password hashing pool.
+# With more than one thread gunicorn runs the gthread worker, so a login
+# burst can only take the hashing threads and the rest of the API stays
+# served; keep the default in step with SERVER_THREADS in settings.
+threads = int(os.getenv("GUNICORN_THREADS", 4))
@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 from datetime import timedelta
 from pathlib import Path
 import dj_database_url
+from django.core.exceptions import ImproperlyConfigured
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -54,13 +55,26 @@ INSTALLED_APPS = [
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.coreapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    )
+        'api.authentication.SharedJWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    # Login attempts, enforced before any password hashing (see api.throttling).
+    # An empty variable turns that throttle off.
+    'DEFAULT_THROTTLE_RATES': {
+        'login_ip': os.getenv('LOGIN_THROTTLE_IP_RATE', '30/min') or None,
+        'login_username': os.getenv('LOGIN_THROTTLE_USERNAME_RATE', '10/min') or None,
+    },
+    # Number of trusted reverse proxies in front of the app (Railway adds one)
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 1)),
 }
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    "api.middleware.CompressionMiddleware",
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -68,9 +82,24 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     "corsheaders.middleware.CorsMiddleware",
+    "api.middleware.RequestMetricsMiddleware",
     "api.middleware.BlacklistAccessTokenMiddleware",  # Add this line
 ]
 
+# Fraction of requests measured by RequestMetricsMiddleware (Server-Timing and /metrics)
+REQUEST_METRICS_SAMPLE_RATE = float(os.getenv("REQUEST_METRICS_SAMPLE_RATE", 1.0))
+# When set, /metrics requires "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+
+# Compression of JSON API responses (CompressionMiddleware). Brotli is offered
+# when the brotli package is installed, gzip otherwise. Responses smaller than
+# MIN_BYTES (login and refresh tokens included) are sent as they are. Any
+# "+json" type is compressed as well; the YAML types are the API schema's.
+RESPONSE_COMPRESSION_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", 1024))
+RESPONSE_COMPRESSION_GZIP_LEVEL = int(os.getenv("RESPONSE_COMPRESSION_GZIP_LEVEL", 6))
+RESPONSE_COMPRESSION_BROTLI_QUALITY = int(os.getenv("RESPONSE_COMPRESSION_BROTLI_QUALITY", 4))
+RESPONSE_COMPRESSION_CONTENT_TYPES = ("application/json", "application/yaml", "application/openapi+yaml")
+
 ROOT_URLCONF = 'troviny.urls'
 
 TEMPLATES = [
@@ -90,6 +119,10 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'troviny.wsgi.application'
+ASGI_APPLICATION = 'troviny.asgi.application'
+
+# Serve the auth and profile endpoints from api.async_views (for uvicorn/ASGI deployments)
+ASYNC_API_VIEWS = os.getenv("ASYNC_API_VIEWS", "0") == "1"
 
 
 # Database
@@ -99,11 +132,85 @@ DATABASES = {
     'default': dj_database_url.config(
         default=os.getenv('DATABASE_PUBLIC_URL'),
         conn_max_age=600,  # Keeps connection open for better performance
+        # Ping connections before reuse; with the pool, on every checkout
+        conn_health_checks=True,
+    )
+}
+
+# Optional streaming replica. User read endpoints and the token revocation
+# refresh read from it (see api.routers); everything else uses the primary.
+# Requires REDIS_URL: read-your-writes pins must be seen by every worker.
+if os.getenv('DATABASE_REPLICA_URL'):
+    DATABASES['replica'] = dj_database_url.parse(
+        os.getenv('DATABASE_REPLICA_URL'),
+        conn_max_age=600,
+        conn_health_checks=True,
     )
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['api.routers.PrimaryReplicaRouter']
+
+# Seconds reads about a user stay on the primary after that user's row is
+# written; should exceed the replica's usual replication lag
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+
+# Connection pooling (psycopg 3 pool, one per worker process and database). A
+# pool replaces persistent connections, so CONN_MAX_AGE must be 0 while it is enabled.
+DB_POOL = os.getenv('DB_POOL', '1') == '1'
+
+for database in DATABASES.values():
+    if not DB_POOL or database.get('ENGINE') != 'django.db.backends.postgresql':
+        continue
+    database['CONN_MAX_AGE'] = 0
+    database.setdefault('OPTIONS', {})['pool'] = {
+        'min_size': int(os.getenv('DB_POOL_MIN_SIZE', 2)),
+        'max_size': int(os.getenv('DB_POOL_MAX_SIZE', 10)),
+        # Seconds a request waits for a free connection before erroring
+        'timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+        # Close idle connections above min_size, and recycle every connection
+        # periodically so server-side restarts and failovers are picked up
+        'max_idle': float(os.getenv('DB_POOL_MAX_IDLE', 300)),
+        'max_lifetime': float(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+    }
+
+# Cache
+# Shared Redis cache when REDIS_URL is set, otherwise a per-process memory cache.
+# Set REDIS_URL whenever more than one worker serves the API: with the memory
+# cache, invalidations only reach the process that made them (check api.W001).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('REDIS_URL'),
+    } if os.getenv('REDIS_URL') else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
 }
 
+# Seconds a serialized profile stays cached (entries are also dropped on save/delete)
+PROFILE_CACHE_TIMEOUT = int(os.getenv("PROFILE_CACHE_TIMEOUT", 300))
+
+# Maximum number of ids accepted by the batch profile endpoint
+USER_BATCH_MAX_IDS = int(os.getenv("USER_BATCH_MAX_IDS", 100))
+
+# Admin changelist: estimate unfiltered counts above this many rows (PostgreSQL only)
+# and cache the distinct values shown in the filter sidebar for this many seconds
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(os.getenv("ADMIN_ESTIMATED_COUNT_THRESHOLD", 100000))
+ADMIN_FACET_CACHE_TIMEOUT = int(os.getenv("ADMIN_FACET_CACHE_TIMEOUT", 600))
+
 AUTH_USER_MODEL = 'api.UserModel'
 
+# Serve the Swagger UI and OpenAPI document. drf_yasg's schema machinery is only
+# imported when one of those URLs is first requested (or by the warm-up).
+API_DOCS_ENABLED = os.getenv("API_DOCS_ENABLED", "1") == "1"
+# Seconds browsers and proxies may reuse the OpenAPI document; the server keeps
+# its generated copy for the lifetime of the worker process
+SCHEMA_CACHE_MAX_AGE = int(os.getenv("SCHEMA_CACHE_MAX_AGE", 300))
+
+# Compile the URL resolver and build the OpenAPI schema when the application
+# is loaded (see troviny.warmup); combine with gunicorn --preload
+WARM_UP_ON_LOAD = os.getenv("WARM_UP_ON_LOAD", "0") == "1"
+
 SWAGGER_SETTINGS = {
     'USE_SESSION_AUTH': False,
     'SECURITY_DEFINITIONS': {
@@ -122,8 +229,66 @@ SIMPLE_JWT = {
     "ROTATE_REFRESH_TOKENS": True,  # Generates a new refresh token when used
     "BLACKLIST_AFTER_ROTATION": True,  # Old refresh tokens become invalid
     "AUTH_HEADER_TYPES": ("Bearer",),
+    "TOKEN_REFRESH_SERIALIZER": "api.tokens.BufferedTokenRefreshSerializer",
 }
 
+# Write-behind token bookkeeping (see api.token_writer). When on, outstanding
+# and blacklist rows are queued and inserted in batches every INTERVAL seconds,
+# or once MAX_BATCH rows are waiting; a logout then reaches other workers'
+# revocation caches up to INTERVAL seconds later than it otherwise would.
+TOKEN_WRITE_BEHIND = os.getenv("TOKEN_WRITE_BEHIND", "0") == "1"
+TOKEN_WRITE_BEHIND_INTERVAL = float(os.getenv("TOKEN_WRITE_BEHIND_INTERVAL", 0.5))
+TOKEN_WRITE_BEHIND_MAX_BATCH = int(os.getenv("TOKEN_WRITE_BEHIND_MAX_BATCH", 500))
+
+# User listing pagination
+USER_LIST_PAGE_SIZE = int(os.getenv("USER_LIST_PAGE_SIZE", 100))
+USER_LIST_MAX_PAGE_SIZE = int(os.getenv("USER_LIST_MAX_PAGE_SIZE", 1000))
+
+# Bulk user export (rows fetched per server-side cursor round trip)
+USER_EXPORT_CHUNK_SIZE = int(os.getenv("USER_EXPORT_CHUNK_SIZE", 2000))
+
+# Upper bound, in seconds, on how long a logout in one worker takes to be seen
+# by the others. Set to 0 to check the blacklist table on every request.
+TOKEN_REVOCATION_CACHE_REFRESH_SECONDS = float(os.getenv("TOKEN_REVOCATION_CACHE_REFRESH_SECONDS", 5))
+
+# Seconds a user's session generation is cached. Ending all sessions updates
+# the shared cache at once; with the per-process memory cache, other workers
+# see it within this many seconds.
+TOKEN_GENERATION_CACHE_SECONDS = int(os.getenv("TOKEN_GENERATION_CACHE_SECONDS", 5))
+
+# gunicorn worker processes and threads per worker; gunicorn reads the same
+# variables (see gunicorn.conf.py)
+SERVER_WORKERS = int(os.getenv("WEB_CONCURRENCY", 1))
+SERVER_THREADS = int(os.getenv("GUNICORN_THREADS", 4))
+
+# Login throttle counters live in the default cache; with a per-process cache
+# every worker would allow the full rate on its own
+if SERVER_WORKERS > 1 and not os.getenv('REDIS_URL') and any(REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'].values()):
+    raise ImproperlyConfigured("Login throttling across several workers requires a shared cache; set REDIS_URL.")
+
+# Password hashing pool used by login/register. Each server process has its
+# own pool, so by default the cores are split between the processes and the
+# host runs about one hash per core. A request arriving while WORKERS hashes
+# run and MAX_PENDING wait is answered with 503 instead of queueing.
+# Under WSGI every hash holds a request thread, so by default hashing may
+# take all but one of a process's threads and the rest of the API stays
+# served; a process with a single thread can do neither (api.W003).
+# Under ASGI hashes hold no thread and up to 16 may wait.
+PASSWORD_HASHING_WORKERS = int(os.getenv(
+    "PASSWORD_HASHING_WORKERS",
+    max(1, (os.cpu_count() or 1) // SERVER_WORKERS) if ASYNC_API_VIEWS
+    else max(1, min((os.cpu_count() or 1) // SERVER_WORKERS, SERVER_THREADS - 1)),
+))
+PASSWORD_HASHING_MAX_PENDING = int(os.getenv(
+    "PASSWORD_HASHING_MAX_PENDING",
+    16 if ASYNC_API_VIEWS else max(0, SERVER_THREADS - 1 - PASSWORD_HASHING_WORKERS),
+))
+
+# Bulk user import (rows validated and inserted per batch)
+USER_IMPORT_BATCH_SIZE = int(os.getenv("USER_IMPORT_BATCH_SIZE", 500))
+# Threads hashing imported passwords; a pool of its own, not the login pool
+USER_IMPORT_HASHING_WORKERS = int(os.getenv("USER_IMPORT_HASHING_WORKERS", os.cpu_count() or 1))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -164,6 +329,16 @@ STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles' 
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Content-addressed profile picture store (see api.images). Inline base64
+# pictures are written here and the user row keeps only the image URL.
+PROFILE_IMAGE_ROOT = os.getenv("PROFILE_IMAGE_ROOT", BASE_DIR / 'media' / 'images')
+PROFILE_IMAGE_URL = '/media/images/'
+PROFILE_IMAGE_MAX_BYTES = int(os.getenv("PROFILE_IMAGE_MAX_BYTES", 5 * 1024 * 1024))
+# Longest external http(s) picture URL accepted
+PROFILE_PICTURE_URL_MAX_LENGTH = int(os.getenv("PROFILE_PICTURE_URL_MAX_LENGTH", 2048))
+# Square bounding boxes served with ?size=<n> (thumbnails need Pillow)
+PROFILE_IMAGE_THUMBNAIL_SIZES = tuple(int(size) for size in os.getenv("PROFILE_IMAGE_THUMBNAIL_SIZES", "64,256").split(","))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -1,7 +1,11 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
+from api.views import metrics, profile_image
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics', metrics, name='metrics'),
+    path(f"{settings.PROFILE_IMAGE_URL.lstrip('/')}<path:name>", profile_image, name='profile-image'),
     path('', include('api.urls'))
 ]
@@ -0,0 +1,51 @@
+"""
+One-time process warm-up for the WSGI/ASGI application.
+
+Run it where the application is loaded (see WARM_UP_ON_LOAD). Under gunicorn
+with ``--preload`` that is the master, so the work is done once before
+forking and every worker starts with it already done. Without preloading,
+each worker does it at boot instead of during its first request.
+
+The warm-up never opens a database connection, because connections must
+not be shared across forked workers.
+"""
+
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import get_resolver
+from rest_framework.request import Request
+
+
+def warm_up():
+    """Import every view, compile the URL resolver and build the API schema; returns ``{step: seconds}``"""
+    timings = {}
+    steps = [("urls", compile_urls)]
+    if settings.API_DOCS_ENABLED:
+        steps.append(("schema", generate_schema))
+
+    for name, step in steps:
+        started = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - started
+
+    connections.close_all()
+    return timings
+
+
+def compile_urls():
+    # Populating the reverse lookup imports the URLconf and every view module
+    # and compiles each pattern's regex
+    get_resolver().reverse_dict
+
+
+def generate_schema():
+    from api.schema import CachedSchemaView
+
+    factory = RequestFactory()
+    for host in settings.ALLOWED_HOSTS:
+        if host.startswith(".") or "*" in host:
+            continue
+        CachedSchemaView.get_schema(Request(factory.get("/swagger.json/", HTTP_HOST=host)))
@@ -14,3 +14,10 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'troviny.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402  Settings are configured by now
+
+if settings.WARM_UP_ON_LOAD:
+    from .warmup import warm_up
+
+    warm_up()